@@ -0,0 +1,86 @@
+"""Measure import cost of the KUB library and integration modules.
+
+Runs each module import in a fresh interpreter with ``python -X importtime``
+and reports the cumulative time of the module itself plus the slowest
+imports it pulled in. Integration modules need Home Assistant installed;
+modules that can't be imported are reported as such.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py kub.kub_utilities --top 15 --runs 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# custom_components/kub/kub is the library, importable as ``kub``
+PATHS = [os.path.join(ROOT, "custom_components", "kub"), ROOT]
+
+DEFAULT_MODULES = [
+    "kub.kub_utilities",
+    "custom_components.kub.config_flow",
+    "custom_components.kub.diagnostics",
+    "custom_components.kub.sensor",
+    "custom_components.kub.binary_sensor",
+    "custom_components.kub.coordinator",
+    "custom_components.kub",
+]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _measure(module: str) -> tuple[int, list[tuple[int, str]]] | str:
+    """Return (cumulative us, [(cumulative us, name)]) or an error message."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(PATHS))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        if match := _LINE.match(line):
+            imports.append((int(match.group(2)), match.group(4)))
+    if proc.returncode != 0:
+        return proc.stderr.strip().splitlines()[-1]
+    total = next((us for us, name in imports if name == module), 0)
+    return total, imports
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals = []
+        imports: list[tuple[int, str]] = []
+        for _ in range(args.runs):
+            result = _measure(module)
+            if isinstance(result, str):
+                print(f"{module}: not importable ({result})")
+                break
+            totals.append(result[0])
+            imports = result[1]
+        else:
+            print(
+                f"{module}: median {statistics.median(totals) / 1000:.1f} ms "
+                f"over {args.runs} runs"
+            )
+            others = [item for item in imports if item[1] != module]
+            for us, name in sorted(others, reverse=True)[: args.top]:
+                print(f"    {us / 1000:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
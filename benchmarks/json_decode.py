@@ -0,0 +1,121 @@
+"""Compare JSON decoders on representative KUB usage-values payloads.
+
+Builds a synthetic usage-values document shaped like KUB's (one aggregate
+entry per day followed by its hourly entries, with readings and costs in a
+parallel usage-aggregate list) for several months of hourly data across
+three services, then times decoding plus normalization with _parse_usage and
+records the peak memory of each decoder.
+
+    python benchmarks/json_decode.py --months 1 3 12
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "kub"))
+
+from kub import kub_utilities  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def build_payload(days: int) -> bytes:
+    """Return a usage-values document for days of hourly data."""
+    values = []
+    aggregates = []
+    start = datetime(2024, 1, 1)
+    for day in range(days):
+        date = start + timedelta(days=day)
+        children = [f"{day}-{hour}" for hour in range(24)]
+        values.append(
+            {
+                "id": f"{day}",
+                "readDateTime": date.isoformat(),
+                "usageValuesChildren": children,
+                "intervalLength": 1440,
+                "meterNumber": "12345678",
+                "status": "VALID",
+            }
+        )
+        aggregates.append(
+            {"readValue": 24.0, "uom": "KWH", "cost": 3.1, "demand": 0.0}
+        )
+        for hour in range(24):
+            values.append(
+                {
+                    "id": f"{day}-{hour}",
+                    "readDateTime": (date + timedelta(hours=hour)).isoformat(),
+                    "usageValuesChildren": [],
+                    "intervalLength": 60,
+                    "meterNumber": "12345678",
+                    "status": "VALID",
+                }
+            )
+            aggregates.append(
+                {"readValue": 1.0, "uom": "KWH", "cost": 0.13, "demand": 0.0}
+            )
+    return json.dumps({"usage-value": values, "usage-aggregate": aggregates}).encode()
+
+
+def _decoders():
+    decoders = {
+        "json (str)": lambda body: json.loads(body.decode()),
+        "json (bytes)": json.loads,
+    }
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        decoders["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    return decoders
+
+
+def run(months: int, repeats: int) -> None:
+    """Benchmark each decoder on three services' worth of payloads."""
+    payloads = [build_payload(months * 30) for _ in range(3)]
+    size = sum(len(payload) for payload in payloads)
+    print(f"{months} month(s), 3 services, {size / 1e6:.1f} MB of JSON")
+    parse = kub_utilities._parse_usage  # pylint: disable=protected-access
+    print(f"  {'decoder':14} {'decode':>9} {'+normalize':>11} {'peak':>9}")
+    for name, loads in _decoders().items():
+        decode = total = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            decoded = [loads(payload) for payload in payloads]
+            decoded_at = time.perf_counter()
+            for document in decoded:
+                parse(document)
+            finished = time.perf_counter()
+            del decoded
+            decode = min(decode, decoded_at - started)
+            total = min(total, finished - started)
+
+        tracemalloc.start()
+        for payload in payloads:
+            parse(loads(payload))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"  {name:14} {decode * 1000:7.1f}ms {total * 1000:9.1f}ms "
+            f"{peak / 1e6:7.1f}MB"
+        )
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, nargs="+", default=[1, 3, 12])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    for months in args.months:
+        run(months, args.repeats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
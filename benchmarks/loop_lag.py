@@ -0,0 +1,87 @@
+"""Measure event loop lag while KUB usage responses are parsed.
+
+Decodes and normalizes synthetic usage-values responses for several
+concurrent accounts through kub_utilities._load_usage. A ticker measures how
+late the loop wakes up. Each size runs twice: once with every response
+parsed on the loop, and once with responses at or above OFFLOAD_THRESHOLD
+handed to the executor.
+
+    python benchmarks/loop_lag.py --days 31 92 365 --accounts 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from json_decode import build_payload  # noqa: E402  pylint: disable=wrong-import-position
+
+from kub import kub_utilities  # noqa: E402  pylint: disable=wrong-import-position
+
+_TICK = 0.005
+
+
+async def _measure(body: bytes, accounts: int) -> tuple[float, float, float]:
+    """Parse body once per account concurrently; return lag p50/max and wall."""
+    loop = asyncio.get_running_loop()
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def _ticker() -> None:
+        while not done.is_set():
+            started = loop.time()
+            await asyncio.sleep(_TICK)
+            lags.append(loop.time() - started - _TICK)
+
+    async def _account() -> None:
+        # Yield first so parses interleave the way concurrent polls do
+        await asyncio.sleep(0)
+        await kub_utilities._load_usage(body)  # pylint: disable=protected-access
+
+    ticker = asyncio.create_task(_ticker())
+    await asyncio.sleep(_TICK * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(_account() for _ in range(accounts)))
+    wall = time.perf_counter() - started
+    done.set()
+    await ticker
+    return statistics.median(lags) * 1000, max(lags) * 1000, wall * 1000
+
+
+async def _run(args) -> None:
+    print(f"{args.accounts} concurrent accounts, threshold {args.threshold} bytes")
+    print(
+        f"{'days':>6} {'size':>9}  {'mode':<8} {'lag p50':>9} "
+        f"{'lag max':>9} {'wall':>9}"
+    )
+    for days in args.days:
+        body = build_payload(days)
+        for mode, threshold in (("loop", sys.maxsize), ("executor", args.threshold)):
+            kub_utilities.set_executor(
+                kub_utilities._run_in_thread,  # pylint: disable=protected-access
+                threshold,
+            )
+            p50, worst, wall = await _measure(body, args.accounts)
+            print(
+                f"{days:>6} {len(body) / 1024:>7.0f}KB  {mode:<8} "
+                f"{p50:>7.2f}ms {worst:>7.2f}ms {wall:>7.0f}ms"
+            )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[31, 92, 365])
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument(
+        "--threshold", type=int, default=kub_utilities.OFFLOAD_THRESHOLD
+    )
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
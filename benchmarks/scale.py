@@ -0,0 +1,425 @@
+"""Load test KUB refreshes for many accounts sharing one event loop.
+
+Starts a fake KUB server in a separate process, then for each entry count
+runs a fresh measuring process that logs in N simulated accounts and
+refreshes them all the way the coordinator does: retrieve_last_31_days,
+then hand hour batches to a simulated recorder thread. Every run reports:
+
+- event loop lag (p50, p99 and worst sleep overshoot)
+- wall time for all refreshes, and p50/p95 per-entry refresh time
+- peak RSS of the measuring process
+- peak open sockets
+- peak depth of the recorder import queue
+
+    python benchmarks/scale.py --entries 10 50 100 200
+    python benchmarks/scale.py --entries 200 --stagger 0 30 --session shared
+
+--stagger spreads the starts of the entries evenly over that many seconds,
+to validate scheduling changes. Entries start already logged in; the B2C
+login flow isn't simulated. The API rate limit is lifted by default so
+the client itself is measured; pass --api-rate 5 to include the library's
+default budget.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "kub"))
+
+import aiohttp  # noqa: E402  pylint: disable=wrong-import-position
+from aiohttp import web  # noqa: E402  pylint: disable=wrong-import-position
+
+from kub import kub_utilities  # noqa: E402  pylint: disable=wrong-import-position
+
+_KUB_BASE = "https://www.kub.org"
+_SERVICE_POINTS = [
+    {"id": "sp-electric", "type": "E-RES"},
+    {"id": "sp-gas", "type": "G-RES"},
+    {"id": "sp-water", "type": "W/S-RES"},
+]
+_UOM = {"E": "KWH", "G": "CCF", "W": "CF"}
+# Hours per statistics batch, as in the integration's statistics import
+_BATCH_HOURS = 168
+
+
+# Fake server
+
+
+def _usage_payload(start: str, end: str, utility_type: str) -> bytes:
+    """Return a usage-values document with every hour from start to end."""
+    values = []
+    aggregates = []
+    day = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    uom = _UOM.get(utility_type, "KWH")
+    while day <= last:
+        values.append(
+            {
+                "id": day.strftime("%Y%m%d"),
+                "readDateTime": day.isoformat(),
+                "usageValuesChildren": [f"{day:%Y%m%d}-{hour}" for hour in range(24)],
+            }
+        )
+        aggregates.append({"readValue": 24.0, "uom": uom, "cost": 3.1})
+        for hour in range(24):
+            values.append(
+                {
+                    "id": f"{day:%Y%m%d}-{hour}",
+                    "readDateTime": (day + timedelta(hours=hour)).isoformat(),
+                    "usageValuesChildren": [],
+                }
+            )
+            aggregates.append({"readValue": 1.0, "uom": uom, "cost": 0.13})
+        day += timedelta(days=1)
+    return json.dumps({"usage-value": values, "usage-aggregate": aggregates}).encode()
+
+
+def _serve(port: int, latency: float) -> None:
+    """Run the fake KUB API until killed."""
+    payloads: dict[tuple, bytes] = {}
+
+    async def _delay() -> None:
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def user(request: web.Request) -> web.Response:
+        await _delay()
+        username = request.match_info["username"]
+        return web.json_response(
+            {"person": [{"id": f"person-{username}", "accounts": ["acct-1"]}]}
+        )
+
+    async def account(_request: web.Request) -> web.Response:
+        await _delay()
+        return web.json_response({"service-point": _SERVICE_POINTS})
+
+    async def usage(request: web.Request) -> web.Response:
+        await _delay()
+        query = request.query
+        key = (query["startDate"], query["endDate"], query["utilityType"])
+        body = payloads.get(key)
+        if body is None:
+            body = payloads[key] = _usage_payload(*key)
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/auth/v1/users/{username}", user)
+    app.router.add_get("/api/cis/v1/accounts/{account}", account)
+    app.router.add_get("/api/ami/v1/usage-values", usage)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Fake KUB server did not start on port {port}")
+
+
+# Measuring process
+
+
+class _RewriteSession:
+    """Send www.kub.org requests made by KubUtility to the fake server."""
+
+    def __init__(self, session: aiohttp.ClientSession, base: str) -> None:
+        self._session = session
+        self._base = base
+
+    def get(self, url: str, **kwargs):
+        return self._session.get(url.replace(_KUB_BASE, self._base), **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self._session.post(url.replace(_KUB_BASE, self._base), **kwargs)
+
+
+def _open_sockets() -> int | None:
+    """Count this process's open sockets, on Linux."""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+class _Recorder:
+    """A single worker thread draining import jobs, like HA's recorder."""
+
+    def __init__(self, seconds_per_batch: float) -> None:
+        self.queue: queue.Queue = queue.Queue()
+        self.max_depth = 0
+        self._seconds = seconds_per_batch
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while (batch := self.queue.get()) is not None:
+            time.sleep(self._seconds)
+            self.queue.task_done()
+
+    def import_statistics(self, batch: list) -> None:
+        """Queue a batch of statistics, as async_import_statistics does."""
+        self.queue.put_nowait(batch)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def stop(self) -> None:
+        """Stop the worker once the queue has drained."""
+        self.queue.put(None)
+        self._thread.join()
+
+
+def _queue_statistics(recorder: _Recorder, usage: dict) -> None:
+    """Batch the hours of complete days, one cost and one usage job each."""
+    for days in usage.values():
+        batch: list = []
+        for date in sorted(days):
+            hours = days[date]
+            if len(hours) < 20:
+                continue
+            for time_key in sorted(hours):
+                hour = hours[time_key]
+                batch.append((hour["readDateTime"], hour["utilityUsed"], hour["cost"]))
+                if len(batch) >= _BATCH_HOURS:
+                    recorder.import_statistics(batch)
+                    recorder.import_statistics(batch)
+                    batch = []
+        if batch:
+            recorder.import_statistics(batch)
+            recorder.import_statistics(batch)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _measure(args) -> dict:
+    """Refresh args.measure simulated entries and collect the metrics."""
+    kub_utilities.configure_rate_limits(
+        api_rate=args.api_rate, api_burst=args.api_burst
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    loop = asyncio.get_running_loop()
+    lags: list[float] = []
+    max_sockets = 0
+    recorder = _Recorder(args.recorder_ms / 1000)
+
+    async def _monitor() -> None:
+        nonlocal max_sockets
+        interval = 0.01
+        tick = 0
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lags.append(loop.time() - started - interval)
+            tick += 1
+            if tick % 5 == 0:
+                max_sockets = max(max_sockets, _open_sockets() or 0)
+
+    def _new_session() -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=120),
+        )
+
+    shared = _new_session() if args.session == "shared" else None
+    sessions: list[aiohttp.ClientSession] = []
+    refresh_times: list[float] = []
+    failures = 0
+
+    async def _entry(index: int) -> None:
+        nonlocal failures
+        if args.stagger:
+            await asyncio.sleep(args.stagger * index / args.measure)
+        session = shared
+        if session is None:
+            session = _new_session()
+            sessions.append(session)
+        kub = kub_utilities.KubUtility(
+            f"user{index}@example.com",
+            "password",
+            session=_RewriteSession(session, base),
+        )
+        # Start logged in; only the data API is simulated
+        # pylint: disable=protected-access
+        kub._session_cookies = {"id_token": "fake"}
+        kub._token_expires_at = datetime.now() + timedelta(hours=1)
+        # pylint: enable=protected-access
+        for _ in range(args.polls):
+            started = time.perf_counter()
+            try:
+                usage = await kub.retrieve_last_31_days()
+            except (Exception, kub_utilities.HTTPError):  # pylint: disable=broad-except
+                failures += 1
+                continue
+            _queue_statistics(recorder, usage)
+            refresh_times.append(time.perf_counter() - started)
+
+    monitor = asyncio.create_task(_monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(_entry(index) for index in range(args.measure)))
+    wall = time.perf_counter() - started
+    monitor.cancel()
+
+    for session in [*sessions, *([shared] if shared else [])]:
+        await session.close()
+    recorder.stop()
+
+    return {
+        "entries": args.measure,
+        "stagger": args.stagger,
+        "session": args.session,
+        "wall_s": round(wall, 3),
+        "refresh_p50_s": round(_percentile(refresh_times, 50), 3),
+        "refresh_p95_s": round(_percentile(refresh_times, 95), 3),
+        "lag_p50_ms": round(statistics.median(lags) * 1000 if lags else 0.0, 2),
+        "lag_p99_ms": round(_percentile(lags, 99) * 1000, 2),
+        "lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "peak_sockets": max_sockets,
+        "peak_recorder_queue": recorder.max_depth,
+        "failures": failures,
+    }
+
+
+# Driver
+
+
+def _run_one(args, entries: int, stagger: float, port: int) -> dict:
+    """Measure in a fresh process so peak RSS belongs to this run alone."""
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--measure",
+        str(entries),
+        "--stagger",
+        str(stagger),
+        "--port",
+        str(port),
+        "--session",
+        args.session,
+        "--polls",
+        str(args.polls),
+        "--api-rate",
+        str(args.api_rate),
+        "--api-burst",
+        str(args.api_burst),
+        "--recorder-ms",
+        str(args.recorder_ms),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout)
+
+
+_COLUMNS = [
+    ("entries", "entries"),
+    ("stagger", "stagger"),
+    ("wall_s", "wall s"),
+    ("refresh_p50_s", "p50 s"),
+    ("refresh_p95_s", "p95 s"),
+    ("lag_p99_ms", "lag p99 ms"),
+    ("lag_max_ms", "lag max ms"),
+    ("peak_rss_mb", "RSS MB"),
+    ("peak_sockets", "sockets"),
+    ("peak_recorder_queue", "rec queue"),
+    ("failures", "failed"),
+]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--stagger", type=float, nargs="+", default=[0.0])
+    parser.add_argument(
+        "--session",
+        choices=["entry", "shared"],
+        default="entry",
+        help="a connection pool per entry, or one shared by all",
+    )
+    parser.add_argument("--polls", type=int, default=1, help="refreshes per entry")
+    parser.add_argument("--latency", type=float, default=0.05, help="server seconds")
+    parser.add_argument("--api-rate", type=float, default=10000.0)
+    parser.add_argument("--api-burst", type=int, default=10000)
+    parser.add_argument(
+        "--recorder-ms", type=float, default=5.0, help="recorder time per batch"
+    )
+    parser.add_argument("--json", action="store_true", help="print raw results")
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        args.stagger = args.stagger[0]
+        print(json.dumps(asyncio.run(_measure(args))))
+        return
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-c", _SERVER_BOOTSTRAP, str(port), str(args.latency)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    try:
+        _wait_for(port)
+        results = [
+            _run_one(args, entries, stagger, port)
+            for stagger in args.stagger
+            for entries in args.entries
+        ]
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"session per {args.session}, {args.polls} poll(s) per entry, "
+        f"{args.latency * 1000:.0f}ms server latency"
+    )
+    print("  ".join(f"{title:>10}" for _key, title in _COLUMNS))
+    for result in results:
+        print("  ".join(f"{result[key]:>10}" for key, _title in _COLUMNS))
+
+
+_SERVER_BOOTSTRAP = (
+    "import sys; from scale import _serve; _serve(int(sys.argv[1]), float(sys.argv[2]))"
+)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,43 +8,51 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 from kub import kub_utilities
 
 from .const import DOMAIN, KUB_API, KUB_COORDINATOR
-from .coordinator import KUBCoordinator
+from .services import async_setup_services
+from .session import async_acquire_login, async_release_login, async_share_options
 
 PLATFORMS: list[Platform] = [
+    Platform.BINARY_SENSOR,
     Platform.SENSOR,
 ]
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the KUB services."""
+    # Parse large usage responses in HA's executor rather than on the loop
+    kub_utilities.set_executor(hass.async_add_executor_job)
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up KUB from a config entry."""
 
     try:
-        username = entry.data.get("username")
-        password = entry.data.get("password")
-        kub = kub_utilities.KubUtility(username, password)
-        await kub.retrieve_account_info()
+        shared = await async_acquire_login(hass, entry)
+    except (ConfigEntryAuthFailed, ConfigEntryNotReady):
+        raise
     except kub_utilities.KUBAuthenticationError as error:
         raise ConfigEntryAuthFailed(error) from error
     except Exception as ex:
         raise ConfigEntryNotReady(ex) from ex
 
-    try:
-        coordinator = KUBCoordinator(hass, kub)
-    except Exception as ex:
-        raise ConfigEntryNotReady(ex) from ex
-
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
-        KUB_COORDINATOR: coordinator,
-        KUB_API: kub,
+        KUB_COORDINATOR: shared.coordinator,
+        KUB_API: shared.api,
     }
 
-    await coordinator.async_config_entry_first_refresh()
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(update_listener))
     return True
 
 
@@ -52,10 +60,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
+        await async_release_login(hass, entry)
 
     return unload_ok
 
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
     """Update Listener."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    # Entries sharing a login share options; reloading the owner reloads all
+    if async_share_options(hass, entry):
+        await hass.config_entries.async_reload(entry.entry_id)
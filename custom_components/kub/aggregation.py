@@ -0,0 +1,152 @@
+"""Incremental usage and cost rollups for KUB."""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any
+
+from .const import ROLLUP_MONTHS, TOU_OFF_PEAK, TOU_ON_PEAK, TOU_SHOULDER
+
+
+def parse_hour_ranges(value: str) -> frozenset[int]:
+    """Parse hour ranges such as "7-11,14-20,22" into a set of hours.
+
+    Ranges include the start hour and exclude the end hour, so "14-20" covers
+    2pm through 7:59pm. A range may wrap past midnight ("22-6").
+    """
+    hours: set[int] = set()
+    for part in value.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        first = int(start)
+        last = int(end) if end else (first + 1) % 24
+        if not 0 <= first <= 23 or not 0 <= last <= 24:
+            raise ValueError(f"Hour out of range: {part}")
+        hour = first
+        while True:
+            hours.add(hour)
+            hour = (hour + 1) % 24
+            if hour == last % 24:
+                break
+    return frozenset(hours)
+
+
+class _MonthRollup:
+    """Running totals for a single utility and calendar month."""
+
+    def __init__(self) -> None:
+        self.daily: dict[str, list[float]] = {}
+        self.hourly: list[list[float]] = [[0.0, 0.0] for _ in range(24)]
+        self.tou: dict[str, list[float]] = {}
+        self.peaks: list[tuple[float, str, float]] = []
+
+
+class KUBUsageRollup:
+    """Per-day, hour-of-day, time-of-use and peak-hour rollups.
+
+    Readings are folded in once, as they arrive, so reading a rollup never
+    rescans the nested usage tree.
+    """
+
+    def __init__(
+        self,
+        on_peak: frozenset[int] = frozenset(),
+        shoulder: frozenset[int] = frozenset(),
+        peak_count: int = 5,
+    ) -> None:
+        """Initialize the rollup."""
+        self.peak_count = peak_count
+        self._buckets = [TOU_OFF_PEAK] * 24
+        for hour in shoulder:
+            self._buckets[hour] = TOU_SHOULDER
+        for hour in on_peak:
+            self._buckets[hour] = TOU_ON_PEAK
+        self._months: dict[str, dict[str, _MonthRollup]] = {}
+        self._last_read: dict[str, str] = {}
+
+    def update(self, usage: dict[str, Any]) -> set[str]:
+        """Fold unseen hourly readings into the rollups.
+
+        Returns the utilities that received new readings.
+        """
+        updated = set()
+        for utility, days in usage.items():
+            if not days:
+                continue
+            last_read = self._last_read.get(utility, "")
+            last_day = last_read[:10]
+            months = self._months.setdefault(utility, {})
+            for day in sorted(days):
+                if day < last_day:
+                    continue
+                hours = days[day]
+                for time in sorted(hours):
+                    reading = hours[time]
+                    read_time = reading.get("readDateTime", "")
+                    if read_time <= last_read:
+                        continue
+                    month = months.get(day[:7])
+                    if month is None:
+                        month = months[day[:7]] = _MonthRollup()
+                    self._add(month, day, int(time[:2]), read_time, reading)
+                    last_read = read_time
+                    updated.add(utility)
+            self._last_read[utility] = last_read
+            for stale in sorted(months)[:-ROLLUP_MONTHS]:
+                del months[stale]
+        return updated
+
+    def _add(
+        self,
+        month: _MonthRollup,
+        day: str,
+        hour: int,
+        read_time: str,
+        reading: dict[str, Any],
+    ) -> None:
+        """Add a single hourly reading to a month's rollups."""
+        used = reading.get("utilityUsed") or 0.0
+        cost = reading.get("cost") or 0.0
+
+        daily = month.daily.setdefault(day, [0.0, 0.0])
+        daily[0] += used
+        daily[1] += cost
+        month.hourly[hour][0] += used
+        month.hourly[hour][1] += cost
+        bucket = month.tou.setdefault(self._buckets[hour], [0.0, 0.0])
+        bucket[0] += used
+        bucket[1] += cost
+
+        peak = (used, read_time, cost)
+        if len(month.peaks) < self.peak_count:
+            heapq.heappush(month.peaks, peak)
+        elif peak > month.peaks[0]:
+            heapq.heapreplace(month.peaks, peak)
+
+    def view(self, utility: str, field: str, month: str | None = None) -> dict:
+        """Return the prebuilt rollups of usage or cost for a month.
+
+        The most recent month with data is used when month is not given.
+        """
+        months = self._months.get(utility)
+        if not months:
+            return {}
+        rollup = months.get(month or max(months))
+        if rollup is None:
+            return {}
+        idx = 0 if field == "usage" else 1
+        return {
+            "daily": {
+                day: round(values[idx], 3) for day, values in rollup.daily.items()
+            },
+            "hourly_profile": [round(values[idx], 3) for values in rollup.hourly],
+            "time_of_use": {
+                bucket: round(values[idx], 3)
+                for bucket, values in sorted(rollup.tou.items())
+            },
+            "peak_hours": [
+                {"start": start, "usage": round(used, 3), "cost": round(cost, 3)}
+                for used, start, cost in sorted(rollup.peaks, reverse=True)
+            ],
+        }
@@ -0,0 +1,271 @@
+"""Anomaly detection over hourly KUB readings."""
+
+from __future__ import annotations
+
+import logging
+import warnings
+from typing import Any
+
+import numpy as np
+
+from .const import (
+    ANOMALY_ELECTRIC_BASELOAD,
+    ANOMALY_GAS_SPIKE,
+    ANOMALY_HISTORY_DAYS,
+    ANOMALY_LEAK_HOURS,
+    ANOMALY_MIN_DAYS,
+    ANOMALY_MIN_SCALE,
+    ANOMALY_THRESHOLD,
+    ANOMALY_TYPES,
+    ANOMALY_WATER_LEAK,
+    ANOMALY_WINDOW_DAYS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Scale factor that turns a median absolute deviation into a standard
+# deviation estimate for normally distributed data.
+_MAD_SCALE = 1.4826
+
+
+def _robust_score(
+    value: float, baseline: np.ndarray, min_scale: float
+) -> tuple[float, float]:
+    """Return the baseline median and the robust z-score of value against it.
+
+    min_scale floors the spread so a flat baseline (a house that never uses
+    water overnight) needs a real change, not any reading at all, to score.
+    """
+    median = float(np.nanmedian(baseline))
+    mad = float(np.nanmedian(np.abs(baseline - median)))
+    scale = max(_MAD_SCALE * mad, min_scale)
+    return median, (value - median) / scale
+
+
+class _UtilityHistory:
+    """Day by hour-of-day matrix of readings for a single utility."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.values = np.full((capacity, 24), np.nan)
+        self.days: list[str] = []
+        self.last_read: str = ""
+        self.evaluated_day: str = ""
+
+    def row(self, day: str) -> int:
+        """Return the row for day, appending a new one if needed."""
+        if self.days and self.days[-1] == day:
+            return len(self.days) - 1
+        if len(self.days) == self.capacity:
+            # Drop the oldest half in one copy so appends stay amortized O(1)
+            keep = self.capacity // 2
+            self.values[:keep] = self.values[self.capacity - keep :]
+            self.values[keep:] = np.nan
+            del self.days[: self.capacity - keep]
+        self.days.append(day)
+        return len(self.days) - 1
+
+    def window(self, row: int, days: int) -> np.ndarray:
+        """Return up to days rows immediately preceding row."""
+        return self.values[max(0, row - days) : row]
+
+
+class KUBAnomalyDetector:
+    """Flag unusual consumption as new hourly readings arrive.
+
+    Each utility keeps a compact day x hour-of-day matrix of its readings.
+    Only readings newer than the last one seen are evaluated, and each is
+    compared to a rolling median/MAD baseline over the preceding days, so the
+    cost per poll is independent of how much history has been retained.
+    """
+
+    def __init__(
+        self,
+        window_days: int = ANOMALY_WINDOW_DAYS,
+        threshold: float = ANOMALY_THRESHOLD,
+        history_days: int = ANOMALY_HISTORY_DAYS,
+    ) -> None:
+        """Initialize the detector."""
+        self.window_days = window_days
+        self.threshold = threshold
+        self.history_days = max(history_days, window_days + 1)
+        self.active: dict[str, dict[str, Any] | None] = {
+            utility: None for utility in ANOMALY_TYPES
+        }
+        self._history: dict[str, _UtilityHistory] = {}
+        self._seeded = False
+
+    def update(self, usage: dict[str, Any]) -> list[dict[str, Any]]:
+        """Ingest new hourly readings and return any anomalies found.
+
+        The first update only builds the baselines. History is kept in memory,
+        so after a restart the fetched month would otherwise be reported
+        again, weeks after the fact.
+        """
+        anomalies: list[dict[str, Any]] = []
+        with warnings.catch_warnings():
+            # Hours missing from every baseline day produce all-NaN slices
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for utility in ANOMALY_TYPES:
+                days = usage.get(utility)
+                if not days:
+                    continue
+                history = self._history.setdefault(
+                    utility, _UtilityHistory(self.history_days)
+                )
+                anomalies.extend(self._update_utility(utility, history, days))
+        if not self._seeded:
+            self._seeded = True
+            for utility in self.active:
+                self.active[utility] = None
+            return []
+        return anomalies
+
+    def _update_utility(
+        self, utility: str, history: _UtilityHistory, days: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """Ingest and evaluate the unseen hours of a single utility."""
+        anomalies = []
+        last_day = history.last_read[:10]
+        for day in sorted(days):
+            if day < last_day:
+                continue
+            hours = days[day]
+            row = None
+            new_hours = []
+            for time in sorted(hours):
+                reading = hours[time]
+                read_time = reading.get("readDateTime", "")
+                if read_time <= history.last_read:
+                    continue
+                if row is None:
+                    row = history.row(day)
+                hour = int(time[:2])
+                history.values[row, hour] = reading.get("utilityUsed") or 0.0
+                history.last_read = read_time
+                new_hours.append(hour)
+
+            if row is None:
+                continue
+            if utility == "gas":
+                found = self._check_gas(history, row, day, new_hours)
+            elif utility == "water":
+                found = self._check_water(history, row, day)
+            else:
+                found = self._check_baseload(history, row, day)
+            if found:
+                anomalies.extend(found)
+                self.active[utility] = found[-1]
+            elif found is not None:
+                active = self.active[utility]
+                # A clean evaluation of a later day clears the previous anomaly
+                if active is not None and active["start"][:10] < day:
+                    self.active[utility] = None
+        return anomalies
+
+    def _check_gas(
+        self, history: _UtilityHistory, row: int, day: str, new_hours: list[int]
+    ) -> list[dict[str, Any]] | None:
+        """Flag hours far above the same hour-of-day on preceding days."""
+        window = history.window(row, self.window_days)
+        if len(window) < ANOMALY_MIN_DAYS:
+            return None
+        hours = np.asarray(new_hours)
+        baseline = window[:, hours]
+        median = np.nanmedian(baseline, axis=0)
+        mad = np.nanmedian(np.abs(baseline - median), axis=0)
+        scale = np.maximum(_MAD_SCALE * mad, ANOMALY_MIN_SCALE["gas"])
+        values = history.values[row, hours]
+        scores = (values - median) / scale
+        return [
+            self._anomaly(
+                "gas", ANOMALY_GAS_SPIKE, day, int(hour), value, base, score
+            )
+            for hour, value, base, score in zip(hours, values, median, scores)
+            if score > self.threshold
+        ]
+
+    def _check_water(
+        self, history: _UtilityHistory, row: int, day: str
+    ) -> list[dict[str, Any]] | None:
+        """Flag nights where water flowed in every overnight hour."""
+        if history.evaluated_day >= day:
+            return None
+        overnight = history.values[row, ANOMALY_LEAK_HOURS]
+        if np.isnan(overnight).any():
+            return None
+        history.evaluated_day = day
+        window = history.window(row, self.window_days)
+        if len(window) < ANOMALY_MIN_DAYS:
+            return None
+        minimum = float(overnight.min())
+        median, score = _robust_score(
+            minimum,
+            np.nanmin(window[:, ANOMALY_LEAK_HOURS], axis=1),
+            ANOMALY_MIN_SCALE["water"],
+        )
+        if minimum > 0 and score > self.threshold:
+            return [
+                self._anomaly(
+                    "water",
+                    ANOMALY_WATER_LEAK,
+                    day,
+                    ANOMALY_LEAK_HOURS[0],
+                    minimum,
+                    median,
+                    score,
+                )
+            ]
+        return []
+
+    def _check_baseload(
+        self, history: _UtilityHistory, row: int, day: str
+    ) -> list[dict[str, Any]] | None:
+        """Flag days whose lowest hourly draw is unusually high."""
+        if history.evaluated_day >= day:
+            return None
+        # Match the statistics importer: a day is only complete with 20+ hours
+        if np.count_nonzero(~np.isnan(history.values[row])) < 20:
+            return None
+        history.evaluated_day = day
+        window = history.window(row, self.window_days)
+        if len(window) < ANOMALY_MIN_DAYS:
+            return None
+        baseload = float(np.nanmin(history.values[row]))
+        median, score = _robust_score(
+            baseload, np.nanmin(window, axis=1), ANOMALY_MIN_SCALE["electricity"]
+        )
+        if score > self.threshold:
+            hour = int(np.nanargmin(history.values[row]))
+            return [
+                self._anomaly(
+                    "electricity",
+                    ANOMALY_ELECTRIC_BASELOAD,
+                    day,
+                    hour,
+                    baseload,
+                    median,
+                    score,
+                )
+            ]
+        return []
+
+    @staticmethod
+    def _anomaly(
+        utility: str,
+        anomaly_type: str,
+        day: str,
+        hour: int,
+        value: float,
+        baseline: float,
+        score: float,
+    ) -> dict[str, Any]:
+        """Build the anomaly record shared by events and binary sensors."""
+        return {
+            "utility": utility,
+            "type": anomaly_type,
+            "start": f"{day}T{hour:02d}:00:00",
+            "value": round(float(value), 3),
+            "baseline": round(float(baseline), 3),
+            "score": round(float(score), 2),
+        }
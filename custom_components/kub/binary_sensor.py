@@ -0,0 +1,63 @@
+"""Platform for binary sensor integration."""
+
+import logging
+from typing import Any
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+)
+from homeassistant.core import HomeAssistant
+
+from .const import ANOMALY_TYPES, DOMAIN, KUB_COORDINATOR
+from .entity import KUBEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
+    """Add binary sensors for passed config_entry in HA."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][KUB_COORDINATOR]
+
+    async_add_entities(
+        KUBAnomalySensor(coordinator, service)
+        for service in coordinator.account.keys()
+        if service in ANOMALY_TYPES
+    )
+
+
+class KUBAnomalySensor(KUBEntity, BinarySensorEntity):
+    """KUB Anomaly Binary Sensor Class."""
+
+    def __init__(self, coordinator, service) -> None:
+        """Initialize KUB Anomaly Sensor."""
+        super().__init__(coordinator, service)
+        self._attr_unique_id = f"kub_{service}_anomaly"
+        self.key = service
+        self._attr_has_entity_name = True
+
+        match service:
+            case "electricity":
+                self._attr_device_class = BinarySensorDeviceClass.PROBLEM
+                self._attr_name = "Electricity Baseload Anomaly"
+            case "gas":
+                self._attr_device_class = BinarySensorDeviceClass.PROBLEM
+                self._attr_name = "Gas Usage Spike"
+            case "water":
+                self._attr_device_class = BinarySensorDeviceClass.MOISTURE
+                self._attr_name = "Water Leak"
+
+    @property
+    def available(self) -> bool:
+        """Return if available."""
+        return True
+
+    @property
+    def is_on(self) -> bool:
+        """Return true if the latest readings are anomalous."""
+        return self.coordinator.data.get("anomalies", {}).get(self.key) is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return details of the active anomaly."""
+        return self.coordinator.data.get("anomalies", {}).get(self.key)
@@ -1,17 +1,30 @@
 """Config flow for the KUB integration."""
 
+import importlib
 import logging
 from typing import Any
 
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigEntry, ConfigFlow
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
-from kub import kub_utilities
 
-from .const import CONF_WATER_STATISTICS, DOMAIN
+from .aggregation import parse_hour_ranges
+from .const import (
+    CONF_PEAK_HOURS,
+    CONF_TOU_ON_PEAK,
+    CONF_TOU_SHOULDER,
+    CONF_WASTEWATER_MULTIPLIER,
+    CONF_WATER_STATISTICS,
+    DEFAULT_PEAK_HOURS,
+    DEFAULT_TOU_ON_PEAK,
+    DEFAULT_TOU_SHOULDER,
+    DEFAULT_WASTEWATER_MULTIPLIER,
+    DOMAIN,
+)
+from .session import async_store_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,21 +33,29 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 )
 
 
-async def validate_input(data: dict[str, Any]) -> dict[str, Any]:
+async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    The authenticated session is handed to entry setup so it doesn't log in again.
     """
+    # The library is only needed once credentials are submitted, so showing
+    # the form doesn't pay for importing it.
+    kub_utilities = await hass.async_add_import_executor_job(
+        importlib.import_module, "kub.kub_utilities"
+    )
     username = data.get("username")
     password = data.get("password")
     try:
         kub = kub_utilities.KubUtility(username, password)
-        await kub.verify_access()
+        await kub.retrieve_account_info()
     except kub_utilities.KUBAuthenticationError as error:
         raise InvalidAuth(error) from error
     except Exception as ex:
         raise CannotConnect(ex) from ex
 
+    async_store_session(hass, kub)
+
     # Return info that you want to store in the config entry.
     return {
         "title": "KUB",
@@ -49,10 +70,6 @@ class KUBConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
-    def __init__(self) -> None:
-        """KUB Config Flow."""
-        self.api: kub_utilities.KubUtility = None
-
     @staticmethod
     @callback
     def async_get_options_flow(config_entry: ConfigEntry):
@@ -70,7 +87,7 @@ class KUBConfigFlow(ConfigFlow, domain=DOMAIN):
             )
 
         try:
-            info = await validate_input(user_input)
+            info = await validate_input(self.hass, user_input)
         except CannotConnect as ex:
             _LOGGER.exception("Cannot connect to KUB: %s", ex)
             errors["base"] = "cannot_connect"
@@ -100,7 +117,7 @@ class KUBConfigFlow(ConfigFlow, domain=DOMAIN):
         errors: dict[str, str] = {}
         if user_input is not None:
             try:
-                info = await validate_input(user_input)
+                info = await validate_input(self.hass, user_input)
             except CannotConnect as ex:
                 _LOGGER.exception("Cannot connect to KUB: %s", ex)
                 errors["base"] = "cannot_connect"
@@ -111,14 +128,10 @@ class KUBConfigFlow(ConfigFlow, domain=DOMAIN):
                 _LOGGER.exception("Unexpected exception during reauth")
                 errors["base"] = "unknown"
             else:
-                self.hass.config_entries.async_update_entry(
+                return self.async_update_reload_and_abort(
                     self._get_reauth_entry(),
                     data=info,
                 )
-                await self.hass.config_entries.async_reload(
-                    self._get_reauth_entry().entry_id
-                )
-                return self.async_abort(reason="reauth_successful")
 
         return self.async_show_form(
             step_id="reauth_confirm",
@@ -149,9 +162,16 @@ class KUBOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_options(self, user_input=None):
         """Handle options step two flow initialized by the user."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            self.options.update(user_input)
-            return await self._update_options()
+            try:
+                parse_hour_ranges(user_input.get(CONF_TOU_ON_PEAK, ""))
+                parse_hour_ranges(user_input.get(CONF_TOU_SHOULDER, ""))
+            except ValueError:
+                errors["base"] = "invalid_hours"
+            else:
+                self.options.update(user_input)
+                return await self._update_options()
 
         return self.async_show_form(
             step_id="options",
@@ -163,8 +183,33 @@ class KUBOptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_WATER_STATISTICS, False
                         ),
                     ): bool,
+                    vol.Optional(
+                        CONF_TOU_ON_PEAK,
+                        default=self.config_entry.options.get(
+                            CONF_TOU_ON_PEAK, DEFAULT_TOU_ON_PEAK
+                        ),
+                    ): str,
+                    vol.Optional(
+                        CONF_TOU_SHOULDER,
+                        default=self.config_entry.options.get(
+                            CONF_TOU_SHOULDER, DEFAULT_TOU_SHOULDER
+                        ),
+                    ): str,
+                    vol.Optional(
+                        CONF_PEAK_HOURS,
+                        default=self.config_entry.options.get(
+                            CONF_PEAK_HOURS, DEFAULT_PEAK_HOURS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=24)),
+                    vol.Optional(
+                        CONF_WASTEWATER_MULTIPLIER,
+                        default=self.config_entry.options.get(
+                            CONF_WASTEWATER_MULTIPLIER, DEFAULT_WASTEWATER_MULTIPLIER
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
                 }
             ),
+            errors=errors,
             last_step=True,
         )
 
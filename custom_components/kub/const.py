@@ -4,7 +4,75 @@ from datetime import timedelta
 
 DOMAIN = "kub"
 DEVICE_SCAN_INTERVAL = timedelta(hours=12)
+# Poll intervals after a failed refresh, the last one repeating until success
+STALE_RETRY_INTERVALS = [
+    timedelta(minutes=2),
+    timedelta(minutes=5),
+    timedelta(minutes=15),
+    timedelta(minutes=30),
+]
 KUB_COORDINATOR = "kub_coordinator"
 CONF_WATER_STATISTICS = "water_statistics"
+CONF_WASTEWATER_MULTIPLIER = "wastewater_multiplier"
+DEFAULT_WASTEWATER_MULTIPLIER = 1.0
 KUB_API = "kub_api"
 KUB_USER = "kub_user"
+
+ANOMALY_EVENT = "kub_anomaly"
+# Fired per service point with the hourly readings new in a refresh
+NEW_READINGS_EVENT = "kub_new_readings"
+ANOMALY_WATER_LEAK = "water_leak"
+ANOMALY_GAS_SPIKE = "gas_spike"
+ANOMALY_ELECTRIC_BASELOAD = "electric_baseload"
+# Utilities checked for anomalies and what is looked for in each
+ANOMALY_TYPES = {
+    "electricity": ANOMALY_ELECTRIC_BASELOAD,
+    "gas": ANOMALY_GAS_SPIKE,
+    "water": ANOMALY_WATER_LEAK,
+}
+# Days of preceding readings used for the rolling baseline
+ANOMALY_WINDOW_DAYS = 28
+# Days of readings retained in memory per utility
+ANOMALY_HISTORY_DAYS = 730
+# Minimum days of history before anything is flagged
+ANOMALY_MIN_DAYS = 7
+# Robust z-score above which a reading is considered anomalous
+ANOMALY_THRESHOLD = 6.0
+# Smallest spread assumed for a baseline, in each utility's unit (kWh, CCF,
+# CF). Gas reads in whole CCF and overnight water is often flat at zero, so a
+# zero MAD is normal and must not turn every small reading into an anomaly.
+ANOMALY_MIN_SCALE = {"electricity": 0.05, "gas": 0.5, "water": 0.25}
+# Overnight hours that must all show flow to count as a possible leak
+ANOMALY_LEAK_HOURS = [0, 1, 2, 3, 4]
+
+CONF_TOU_ON_PEAK = "tou_on_peak_hours"
+CONF_TOU_SHOULDER = "tou_shoulder_hours"
+CONF_PEAK_HOURS = "peak_hours"
+DEFAULT_TOU_ON_PEAK = "14-20"
+DEFAULT_TOU_SHOULDER = ""
+DEFAULT_PEAK_HOURS = 5
+TOU_ON_PEAK = "on_peak"
+TOU_SHOULDER = "shoulder"
+TOU_OFF_PEAK = "off_peak"
+# Calendar months of rollups retained per utility
+ROLLUP_MONTHS = 13
+
+SERVICE_EXPORT = "export"
+EXPORT_DIR = "kub_exports"
+EXPORT_PROGRESS_EVENT = "kub_export_progress"
+EXPORT_FORMATS = ["csv", "parquet"]
+# Days requested from KUB per export chunk
+EXPORT_CHUNK_DAYS = 31
+
+SERVICE_REPAIR_STATISTICS = "repair_statistics"
+# Days checked for statistics gaps by the daily repair pass
+STATISTICS_REPAIR_DAYS = 90
+
+SERVICE_PROFILE = "profile"
+PROFILE_DIR = "kub_profiles"
+
+# hass.data key for logins handed from a config flow to entry setup
+SESSION_HANDOFF = "kub_session_handoff"
+SESSION_HANDOFF_TTL = 300
+# hass.data key for logins shared by entries with the same username
+SESSION_REGISTRY = "kub_session_registry"
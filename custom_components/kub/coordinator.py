@@ -2,25 +2,33 @@
 
 from __future__ import annotations
 
-import datetime
+import importlib
 import logging
+from types import ModuleType
 from typing import Any
-from zoneinfo import ZoneInfo
 
 from homeassistant import config_entries
-from homeassistant.components.recorder.models import (StatisticData,
-                                                      StatisticMeanType,
-                                                      StatisticMetaData)
-from homeassistant.components.recorder.statistics import \
-    async_import_statistics
-from homeassistant.const import UnitOfEnergy, UnitOfVolume
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryAuthFailed
-from homeassistant.helpers.update_coordinator import (DataUpdateCoordinator,
-                                                      UpdateFailed)
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 from kub import kub_utilities
 
-from .const import CONF_WATER_STATISTICS, DEVICE_SCAN_INTERVAL, DOMAIN
+from .aggregation import KUBUsageRollup, parse_hour_ranges
+from .const import (
+    ANOMALY_EVENT,
+    CONF_PEAK_HOURS,
+    CONF_TOU_ON_PEAK,
+    CONF_TOU_SHOULDER,
+    DEFAULT_PEAK_HOURS,
+    DEFAULT_TOU_ON_PEAK,
+    DEFAULT_TOU_SHOULDER,
+    DEVICE_SCAN_INTERVAL,
+    DOMAIN,
+    NEW_READINGS_EVENT,
+    STALE_RETRY_INTERVALS,
+    STATISTICS_REPAIR_DAYS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,11 +47,29 @@ class KUBCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
         self.hass = hass
         self.config_entry = config_entries.current_entry.get()
+        # KUB entities currently added to hass, maintained by KUBEntity
         self.entities = []
+        # Utilities whose values changed in the latest refresh
+        self.changed: set[str] = set()
+        self._fingerprints: dict[str, tuple] = {}
         self.api = api
         self.username = api.username
         self.password = api.password
         self.account = api.account
+        # Created on the first refresh so NumPy isn't imported at startup
+        self.anomaly_detector = None
+        # Set by the kub.profile service for the next few refreshes
+        self.profiler = None
+        options = self.config_entry.options
+        self.rollup = KUBUsageRollup(
+            on_peak=parse_hour_ranges(
+                options.get(CONF_TOU_ON_PEAK, DEFAULT_TOU_ON_PEAK)
+            ),
+            shoulder=parse_hour_ranges(
+                options.get(CONF_TOU_SHOULDER, DEFAULT_TOU_SHOULDER)
+            ),
+            peak_count=options.get(CONF_PEAK_HOURS, DEFAULT_PEAK_HOURS),
+        )
         self.data = {
             "usage": {},
             "current_electricity": {},
@@ -58,126 +84,236 @@ class KUBCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 "water": {"usage": None, "cost": None},
                 "wastewater": {"usage": None, "cost": None},
             },
+            # Billing cycle to date, for services with a known cycle
+            "cycle_total": api.cycle_total,
+            "anomalies": {},
+            # Last known good snapshot; stale while a failed poll is retried
+            "freshness": {
+                "version": 0,
+                "last_success": None,
+                "stale": False,
+                "error": None,
+                "retry_at": None,
+                "services": {},
+            },
         }
+        self._stale_retries = 0
+        self._repaired_on = None
+        # Newest readDateTime published per utility; None until the first refresh
+        self._published: dict[str, str] | None = None
 
     async def _async_update_data(self) -> dict[str, Any]:
-        """Get the latest data from KUB."""
+        """Get the latest data from KUB, serving the last good data on failure."""
         try:
-            self.data["usage"] = await self.api.retrieve_last_31_days()
+            if self.profiler is None:
+                return await self._async_fetch_data()
+            try:
+                return await self.profiler.async_profile(self._async_fetch_data)
+            finally:
+                if self.profiler.remaining <= 0:
+                    self.profiler = None
+        except UpdateFailed as err:
+            freshness = self.data["freshness"]
+            if freshness["last_success"] is None:
+                # Nothing good to serve yet, so let setup retry
+                raise
+            retry = STALE_RETRY_INTERVALS[
+                min(self._stale_retries, len(STALE_RETRY_INTERVALS) - 1)
+            ]
+            self._stale_retries += 1
+            self.update_interval = retry
+            freshness["stale"] = True
+            freshness["error"] = str(err)
+            freshness["retry_at"] = dt_util.utcnow() + retry
+            self._update_service_freshness()
+            self.api.start_token_refresh(retry)
+            _LOGGER.warning(
+                "Serving KUB data from %s, retrying in %s: %s",
+                freshness["last_success"],
+                retry,
+                err,
+            )
+            self.changed = self._changed_utilities(set())
+            return self.data
+
+    def _mark_fresh(self) -> None:
+        """Record a successful fetch and return to the normal poll interval."""
+        now = dt_util.utcnow()
+        freshness = self.data["freshness"]
+        freshness["version"] += 1
+        freshness["last_success"] = now
+        freshness["stale"] = False
+        freshness["error"] = None
+        freshness["retry_at"] = None
+        self._update_service_freshness()
+        self._stale_retries = 0
+        self.update_interval = DEVICE_SCAN_INTERVAL
+
+    def _update_service_freshness(self) -> None:
+        """Record when each service was fetched and its newest reading.
+
+        Services fetch independently, so some may be fresh even when the
+        refresh as a whole failed.
+        """
+        services = self.data["freshness"]["services"]
+        for utility, fetched in self.api.fetched_at.items():
+            days = self.data["usage"].get(utility)
+            newest = None
+            if days:
+                hours = days[max(days)]
+                newest = max(
+                    (hour["readDateTime"] for hour in hours.values()), default=None
+                )
+            services[utility] = {"fetched": fetched, "newest_reading": newest}
+
+    async def async_start_profiling(self, refreshes: int) -> None:
+        """Profile the next refreshes, replacing any profiling in progress."""
+        profiler = await self._async_import("profiler")
+        self.profiler = profiler.KUBProfiler(self.hass, refreshes)
+
+    async def _async_fetch_data(self) -> dict[str, Any]:
+        """Fetch usage and update statistics, anomalies and rollups."""
+        self.changed = set()
+        try:
+            usage = await self.api.retrieve_last_31_days()
+            _LOGGER.debug("KUB poll transfer: %s", self.api.last_poll_transfer)
+            # Because KUB provides historical usage/cost with a delay of approximately one day
+            # we need to insert data into statistics.
+            await self._repair_statistics()
+            await self._insert_statistics(usage)
+            await self._detect_anomalies(usage)
+            self._publish_new_readings(usage)
+            updated = self.rollup.update(usage)
+            # The api swaps in new objects on success, so the last good
+            # snapshot is only replaced once the whole refresh has worked
+            self.data["usage"] = usage
             self.data["monthly_total"] = self.api.monthly_total
+            self.data["cycle_total"] = self.api.cycle_total
             self.data["services"] = self.api.services
             self.data["service_list"] = self.api.service_list
-            # Because KUB provides historical usage/cost with a delay of approximately one day
-            # we need to insert data into statistics.
-            await self._insert_statistics()
+            self._mark_fresh()
+            # Rescheduled every poll, so it resumes once a re-login succeeds
+            self.api.start_token_refresh(self.update_interval)
+            self.changed = self._changed_utilities(updated)
             return self.data
         except kub_utilities.KUBAuthenticationError as error:
             raise ConfigEntryAuthFailed(error) from error
-        except Exception as ex:
+        except (Exception, kub_utilities.HTTPError) as ex:
             raise UpdateFailed(
                 f"Error communicating with the KUB api {ex}") from ex
 
-    async def _insert_statistics(self) -> None:
-        """Insert KUB statistics."""
-        for utility in self.data["usage"]:
-            utility_data = self.data["usage"][utility]
-            cost_statistic_id = f"sensor.kub_{utility}_cost"
-            consumption_statistic_id = f"sensor.kub_{utility}_consumption"
-            _LOGGER.debug(
-                "Updating Statistics for %s and %s",
-                cost_statistic_id,
-                consumption_statistic_id,
+    def _changed_utilities(self, updated: set[str]) -> set[str]:
+        """Return the utilities whose values differ from the previous refresh.
+
+        updated holds utilities that received new hourly readings; totals and
+        anomaly state are compared against what the last refresh produced.
+        """
+        changed = set(updated)
+        for utility, totals in self.data["monthly_total"].items():
+            cycle = self.data["cycle_total"].get(utility, {})
+            fingerprint = (
+                totals.get("usage"),
+                totals.get("cost"),
+                cycle.get("usage"),
+                cycle.get("cost"),
+                self.data["anomalies"].get(utility),
+                self.data["freshness"]["stale"],
             )
+            if self._fingerprints.get(utility) != fingerprint:
+                self._fingerprints[utility] = fingerprint
+                changed.add(utility)
+        return changed
+
+    async def _detect_anomalies(self, usage: dict[str, Any]) -> None:
+        """Evaluate newly fetched hours and fire an event for each anomaly."""
+        if self.anomaly_detector is None:
+            module = await self._async_import("anomaly")
+            self.anomaly_detector = module.KUBAnomalyDetector()
+            self.data["anomalies"] = self.anomaly_detector.active
+        for anomaly in self.anomaly_detector.update(usage):
+            _LOGGER.debug("Detected %s at %s", anomaly["type"], anomaly["start"])
+            self.hass.bus.async_fire(ANOMALY_EVENT, anomaly)
 
-            cost_reads = utility_data
-            cost_sum = 0.0
-            consumption_sum = 0.0
-            last_stats_time = None
-            cost_statistics = []
-            consumption_statistics = []
-
-            for date in cost_reads:
-                day = cost_reads[date]
-                # Skip loading statistics that don't have a full days worth of data
-                # We will populate this day on the next pass
-                # HA displays errors in utility usage if partial day stats are added
-                if len(day) < 20:
+    def _publish_new_readings(self, usage: dict[str, Any]) -> None:
+        """Fire an event per service point with the hours new in this refresh.
+
+        The first refresh only records where each utility's readings end, so
+        a restart does not replay the whole month. Wastewater billed from the
+        water service point rides along in the water event.
+        """
+        seeding = self._published is None
+        published = self._published = self._published or {}
+        combined = self.api.wastewater_combined
+        wastewater = usage.get("wastewater") if combined else None
+        for utility, days in usage.items():
+            if not days or (combined and utility == "wastewater"):
+                continue
+            last_read = published.get(utility, "")
+            readings = []
+            for day in sorted(days):
+                if day < last_read[:10]:
                     continue
-                for time in day:
-                    hour = day[time]
-                    timestamp = hour.get("readDateTime")
-                    naive_datetime = datetime.datetime.fromisoformat(timestamp)
-                    timezone = ZoneInfo("EST")
-                    start = naive_datetime.replace(tzinfo=timezone)
-                    if (
-                        last_stats_time is not None
-                        and start.timestamp() <= last_stats_time
-                    ):
-                        continue
-
-                    # If we are processing water and user has selected to include
-                    # waste water, double count usage as KUB does. This is not
-                    # sufficient for residences with separate waste water meters.
-                    # Please help if this is you!
-                    if (
-                        utility.lower()
-                        == kub_utilities.KUBUtilityTypes.WATER.name.lower()
-                        and self.config_entry.options.get(CONF_WATER_STATISTICS, False)
-                        is True
-                    ):
-                        cost_sum += hour.get("cost")
-                        consumption_sum += hour.get("utilityUsed")
-
-                    cost_sum += hour.get("cost")
-                    consumption_sum += hour.get("utilityUsed")
-
-                    cost_statistics.append(
-                        StatisticData(start=start, state=hour.get(
-                            "cost"), sum=cost_sum)
-                    )
-                    consumption_statistics.append(
-                        StatisticData(
-                            start=start,
-                            state=hour.get("utilityUsed"),
-                            sum=consumption_sum,
-                        )
-                    )
-
-            name_prefix = f"KUB {utility.capitalize()}"
-            cost_metadata = StatisticMetaData(
-                mean_type=StatisticMeanType.NONE,
-                has_sum=True,
-                name=f"{name_prefix} Cost",
-                source="recorder",
-                statistic_id=cost_statistic_id,
-                unit_of_measurement="USD",
-                unit_class=None,
+                hours = days[day]
+                for time in sorted(hours):
+                    reading = hours[time]
+                    if reading.get("readDateTime", "") > last_read:
+                        readings.append((day, time, reading))
+            if not readings:
+                continue
+            published[utility] = readings[-1][2]["readDateTime"]
+            if seeding:
+                continue
+            _LOGGER.debug("%s new %s readings", len(readings), utility)
+            events = []
+            for day, time, reading in readings:
+                event = {
+                    "start": reading["readDateTime"],
+                    "usage": reading.get("utilityUsed"),
+                    "cost": reading.get("cost"),
+                }
+                if utility == "water" and wastewater is not None:
+                    derived = wastewater[day][time]
+                    event["wastewater_usage"] = derived.get("utilityUsed")
+                    event["wastewater_cost"] = derived.get("cost")
+                events.append(event)
+            self.hass.bus.async_fire(
+                NEW_READINGS_EVENT,
+                {
+                    "utility": utility,
+                    "service_id": self.api.account.get(utility),
+                    "uom": readings[0][2].get("uom"),
+                    "readings": events,
+                },
             )
 
-            if (
-                utility.lower()
-                == kub_utilities.KUBUtilityTypes.ELECTRICITY.name.lower()
-            ):
-                unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-                unit_class = "energy"
-            elif utility.lower() == kub_utilities.KUBUtilityTypes.GAS.name.lower():
-                unit_of_measurement = UnitOfVolume.CENTUM_CUBIC_FEET
-                unit_class = "volume"
-            else:
-                unit_of_measurement = UnitOfVolume.CUBIC_FEET
-                unit_class = "volume"
-
-            consumption_metadata = StatisticMetaData(
-                mean_type=StatisticMeanType.NONE,
-                has_sum=True,
-                name=f"{name_prefix} Consumption",
-                source="recorder",
-                statistic_id=consumption_statistic_id,
-                unit_of_measurement=unit_of_measurement,
-                unit_class=unit_class,
-            )
+    async def _repair_statistics(self) -> None:
+        """Refill gaps in the imported statistics, once a day."""
+        today = dt_util.now().date()
+        if self._repaired_on == today:
+            return
+        self._repaired_on = today
+        try:
+            await self.async_repair_statistics(STATISTICS_REPAIR_DAYS)
+        except kub_utilities.KUBAuthenticationError:
+            raise
+        except (Exception, kub_utilities.HTTPError) as err:
+            # The next refresh tomorrow tries again; don't fail this one
+            _LOGGER.warning("Could not repair KUB statistics: %s", err)
 
-            async_import_statistics(self.hass, cost_metadata, cost_statistics)
-            async_import_statistics(
-                self.hass, consumption_metadata, consumption_statistics
-            )
+    async def async_repair_statistics(self, days: int) -> dict[str, int]:
+        """Refetch and re-import days missing from the last days of statistics."""
+        statistics = await self._async_import("statistics")
+        return await statistics.async_repair_statistics(
+            self.hass, self.config_entry, self.api, days
+        )
+
+    async def _insert_statistics(self, usage: dict[str, Any]) -> None:
+        """Insert KUB statistics."""
+        statistics = await self._async_import("statistics")
+        await statistics.async_insert_statistics(self.hass, self.config_entry, usage)
+
+    async def _async_import(self, name: str) -> ModuleType:
+        """Import a submodule of the integration off the event loop."""
+        return await self.hass.async_add_import_executor_job(
+            importlib.import_module, f"{__package__}.{name}"
+        )
@@ -2,21 +2,93 @@
 
 from __future__ import annotations
 
-from typing import Any
+import datetime
+from typing import TYPE_CHECKING, Any
+from zoneinfo import ZoneInfo
 
 from homeassistant.components.diagnostics.util import async_redact_data
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
 from .const import DOMAIN, KUB_COORDINATOR
-from .coordinator import KUBCoordinator
 
-TO_REDACT = {"username", "password", "usage", "account", "locationDetails", "premise"}
+if TYPE_CHECKING:
+    from .coordinator import KUBCoordinator
+
+TO_REDACT = {"username", "password", "account", "locationDetails", "premise"}
+
+# KUB reads meters on Knoxville's clock, so DST changes shorten a day
+_KUB_TIMEZONE = ZoneInfo("America/New_York")
+
+
+def _expected_hours(day: str) -> int:
+    """Hourly readings a complete local day holds.
+
+    The spring change leaves 23 hours. The autumn one repeats an hour, but
+    readings are keyed by clock time, so it still holds 24.
+    """
+    start = datetime.datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=_KUB_TIMEZONE)
+    end = start + datetime.timedelta(days=1)
+    elapsed = end.astimezone(datetime.UTC) - start.astimezone(datetime.UTC)
+    return min(int(elapsed.total_seconds() // 3600), 24)
+
+
+def _summarize_usage(days: dict[str, Any]) -> dict[str, Any]:
+    """Summarize one utility's hourly usage without copying it."""
+    hours_per_day = {day: len(hours) for day, hours in sorted(days.items())}
+    oldest = newest = None
+    usage = cost = 0.0
+    for hours in days.values():
+        for reading in hours.values():
+            read_time = reading.get("readDateTime")
+            if read_time:
+                oldest = read_time if oldest is None else min(oldest, read_time)
+                newest = read_time if newest is None else max(newest, read_time)
+            usage += reading.get("utilityUsed") or 0.0
+            cost += reading.get("cost") or 0.0
+    return {
+        "days": len(hours_per_day),
+        "hours": sum(hours_per_day.values()),
+        "incomplete_days": {
+            day: count
+            for day, count in hours_per_day.items()
+            if count < _expected_hours(day)
+        },
+        "oldest_reading": oldest,
+        "newest_reading": newest,
+        "usage": round(usage, 3),
+        "cost": round(cost, 2),
+    }
 
 
 async def async_get_config_entry_diagnostics(
     hass: HomeAssistant, entry: ConfigEntry
 ) -> dict[str, Any]:
-    """Return diagnostics for a config entry."""
+    """Return diagnostics for a config entry.
+
+    The hourly usage is summarized per utility rather than dumped, so only
+    the small account and service point documents go through redaction.
+    """
     coordinator: KUBCoordinator = hass.data[DOMAIN][entry.entry_id][KUB_COORDINATOR]
-    return async_redact_data(coordinator.data, TO_REDACT)
+    data = coordinator.data
+    api = coordinator.api
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "services": async_redact_data(data["services"], TO_REDACT),
+        "service_list": list(data["service_list"]),
+        "usage": {
+            utility: _summarize_usage(days)
+            for utility, days in data["usage"].items()
+        },
+        "monthly_total": data["monthly_total"],
+        "cycle_total": data["cycle_total"],
+        "anomalies": data["anomalies"],
+        "freshness": data["freshness"],
+        "transfer": {
+            "last_poll": api.last_poll_transfer,
+            "total": api.response_cache.stats(),
+        },
+    }
@@ -1,6 +1,6 @@
 """Base entity for KUB Integration"""
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
@@ -16,11 +16,29 @@ async def async_setup_entry(hass: HomeAssistant, config_entry):
 class KUBEntity(CoordinatorEntity[KUBCoordinator]):
     """Common entity class for all KUB entities"""
 
-    def __init__(self, coordinator) -> None:
-        """Initialize KUB Entity."""
-        super().__init__(coordinator)
+    def __init__(self, coordinator, service: str | None = None) -> None:
+        """Initialize KUB Entity.
+
+        service is the utility the entity reports on; the entity only writes
+        state when the coordinator reports that utility as changed.
+        """
+        super().__init__(coordinator, context=service)
         self.coordinator = coordinator
+
+    async def async_added_to_hass(self) -> None:
+        """Register with the coordinator while added to hass."""
+        await super().async_added_to_hass()
         self.coordinator.entities.append(self)
+        self.async_on_remove(lambda: self.coordinator.entities.remove(self))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when this entity's utility changed."""
+        if (
+            self.coordinator_context is None
+            or self.coordinator_context in self.coordinator.changed
+        ):
+            self.async_write_ha_state()
 
     @property
     def device_info(self) -> DeviceInfo:
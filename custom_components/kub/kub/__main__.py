@@ -0,0 +1,279 @@
+"""Command line interface for the Knoxville Utilities Board API
+
+Examples:
+    python -m kub services -u me@example.com
+    python -m kub usage -u me@example.com --start 2024-01-01 --end 2024-01-31
+    python -m kub batch --credentials accounts.csv --concurrency 8 --output out/
+"""
+
+import argparse
+import asyncio
+import csv
+import getpass
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from .kub_utilities import (
+    HTTPError,
+    KUBAuthenticationError,
+    KubUtility,
+    configure_rate_limits,
+    rate_limit_stats,
+)
+from .replay import RecordingSession, ReplaySession
+
+_CSV_COLUMNS = ["utility", "read_date_time", "usage", "uom", "cost"]
+
+
+def _new_session(concurrency: int) -> aiohttp.ClientSession:
+    """Create the connection pool shared by every account."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=max(concurrency, 1) * 2),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
+
+
+async def _dump_usage(kub: KubUtility, start: str, end: str, fmt: str, out) -> int:
+    """Write usage for a date range to out, returning the number of rows."""
+    rows = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(_CSV_COLUMNS)
+        async for utility, _date, hours in kub.iter_usage_by_range(start, end):
+            for hour in hours.values():
+                writer.writerow(
+                    [
+                        utility,
+                        hour["readDateTime"],
+                        hour["utilityUsed"],
+                        hour["uom"],
+                        hour["cost"],
+                    ]
+                )
+                rows += 1
+        return rows
+
+    usage: dict[str, dict] = {}
+    async for utility, date, hours in kub.iter_usage_by_range(start, end):
+        usage.setdefault(utility, {})[date] = hours
+        rows += len(hours)
+    json.dump(usage, out, indent=2)
+    out.write("\n")
+    return rows
+
+
+@asynccontextmanager
+async def _transport(args):
+    """Yield a live, recording or replaying session for a single account."""
+    if args.replay:
+        yield ReplaySession(args.replay, secrets=[args.username], latency=args.latency)
+        return
+    async with _new_session(1) as session:
+        if not args.record:
+            yield session
+            return
+        recorder = RecordingSession(session, secrets=[args.username, args.password])
+        try:
+            yield recorder
+        finally:
+            recorder.save(args.record)
+
+
+async def _services(args) -> int:
+    async with _transport(args) as session:
+        kub = KubUtility(args.username, args.password, session=session)
+        await kub.retrieve_account_info()
+    json.dump(
+        {"person_id": kub.person_id, "account_id": kub.account_id, **kub.account},
+        sys.stdout,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+    return 0
+
+
+async def _usage(args) -> int:
+    async with _transport(args) as session:
+        kub = KubUtility(args.username, args.password, session=session)
+        await _dump_usage(kub, args.start, args.end, args.format, sys.stdout)
+    return 0
+
+
+def _read_credentials(path: str) -> list[tuple[str, str]]:
+    """Read username,password pairs, one per line, from a CSV file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        return [
+            (row[0].strip(), row[1].strip())
+            for row in csv.reader(file)
+            if len(row) >= 2 and row[0].strip() and not row[0].startswith("#")
+        ]
+
+
+async def _batch(args) -> int:
+    credentials = _read_credentials(args.credentials)
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: dict[str, str] = {}
+    total_rows = 0
+    transfer = {"requests": 0, "not_modified": 0, "bytes_received": 0}
+
+    async def _poll(session: aiohttp.ClientSession, username: str, password: str):
+        nonlocal total_rows
+        async with semaphore:
+            kub = KubUtility(username, password, session=session)
+            try:
+                if args.output:
+                    path = os.path.join(args.output, f"{username}.{args.format}")
+                    with open(path, "w", newline="", encoding="utf-8") as out:
+                        rows = await _dump_usage(
+                            kub, args.start, args.end, args.format, out
+                        )
+                else:
+                    rows = 0
+                    async for _utility, _date, hours in kub.iter_usage_by_range(
+                        args.start, args.end
+                    ):
+                        rows += len(hours)
+            except KUBAuthenticationError as err:
+                results[username] = f"auth failed: {err}"
+            except HTTPError as err:
+                results[username] = f"HTTP {err.status_code}: {err.message}"
+            except Exception as err:  # pylint: disable=broad-except
+                results[username] = f"failed: {err!r}"
+            else:
+                total_rows += rows
+                results[username] = f"{rows} rows"
+            finally:
+                stats = kub.response_cache.stats()
+                for key in transfer:
+                    transfer[key] += stats[key]
+
+    started = time.perf_counter()
+    async with _new_session(args.concurrency) as session:
+        await asyncio.gather(
+            *(_poll(session, username, password) for username, password in credentials)
+        )
+    elapsed = time.perf_counter() - started
+
+    for username, result in results.items():
+        print(f"{username}: {result}", file=sys.stderr)
+    print(
+        f"{len(credentials)} accounts, {total_rows} rows in {elapsed:.2f}s "
+        f"({len(credentials) / elapsed if elapsed else 0:.2f} accounts/s, "
+        f"concurrency {args.concurrency})",
+        file=sys.stderr,
+    )
+    print(
+        f"{transfer['requests']} requests, {transfer['not_modified']} not modified, "
+        f"{transfer['bytes_received'] / 1024:.0f} KiB received",
+        file=sys.stderr,
+    )
+    for budget, stats in rate_limit_stats().items():
+        print(
+            f"{budget} budget: {stats['requests']} requests, "
+            f"{stats['delayed']} delayed, {stats['queued_seconds']}s queued "
+            f"(max {stats['max_queued_seconds']}s)",
+            file=sys.stderr,
+        )
+    return 0 if all(result.endswith("rows") for result in results.values()) else 1
+
+
+def _parser() -> argparse.ArgumentParser:
+    today = datetime.today()
+    default_start = (today - timedelta(days=31)).strftime("%Y-%m-%d")
+    default_end = today.strftime("%Y-%m-%d")
+
+    parser = argparse.ArgumentParser(
+        prog="python -m kub", description="Knoxville Utilities Board API client"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def _add_login(command):
+        command.add_argument("-u", "--username", required=True)
+        command.add_argument(
+            "-p",
+            "--password",
+            default=os.environ.get("KUB_PASSWORD"),
+            help="defaults to $KUB_PASSWORD, or prompts when unset",
+        )
+        command.add_argument(
+            "--record", metavar="FILE", help="save redacted traffic to FILE"
+        )
+        command.add_argument(
+            "--replay", metavar="FILE", help="serve traffic from FILE, offline"
+        )
+        command.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="seconds added to each replayed response",
+        )
+
+    def _add_range(command):
+        command.add_argument("--start", default=default_start, help="YYYY-MM-DD")
+        command.add_argument("--end", default=default_end, help="YYYY-MM-DD")
+        command.add_argument("--format", choices=["json", "csv"], default="json")
+
+    _add_login(
+        commands.add_parser("services", help="log in and list service points")
+    )
+
+    usage = commands.add_parser("usage", help="dump hourly usage for a date range")
+    _add_login(usage)
+    _add_range(usage)
+
+    batch = commands.add_parser(
+        "batch", help="poll many accounts concurrently over a shared pool"
+    )
+    batch.add_argument(
+        "--credentials",
+        required=True,
+        help="CSV file with one username,password pair per line",
+    )
+    batch.add_argument("--concurrency", type=int, default=4)
+    batch.add_argument(
+        "--auth-rate", type=float, help="login requests per second, all accounts"
+    )
+    batch.add_argument(
+        "--api-rate", type=float, help="data API requests per second, all accounts"
+    )
+    batch.add_argument(
+        "--output", help="directory for one usage file per account (optional)"
+    )
+    _add_range(batch)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the command line interface."""
+    args = _parser().parse_args(argv)
+    if args.command in ("services", "usage") and args.replay:
+        args.password = args.password or "replay"
+    if args.command in ("services", "usage") and not args.password:
+        args.password = getpass.getpass(f"KUB password for {args.username}: ")
+    if args.command == "batch":
+        configure_rate_limits(auth_rate=args.auth_rate, api_rate=args.api_rate)
+    command = {"services": _services, "usage": _usage, "batch": _batch}
+    try:
+        return asyncio.run(command[args.command](args))
+    except KUBAuthenticationError as err:
+        print(f"Authentication failed: {err}", file=sys.stderr)
+        return 1
+    except HTTPError as err:
+        print(
+            f"KUB request failed: HTTP {err.status_code}: {err.message}",
+            file=sys.stderr,
+        )
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,24 @@
-"""Knoxville Utilities Board API"""
+"""Knoxville Utilities Board API
 
-import base64
-import copy
-import hashlib
-import re
-import secrets
+aiohttp and the modules only needed to log in are imported where they are
+used, so importing this module stays cheap for config flows and tooling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json as _json
+import logging
+import time
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import TYPE_CHECKING, Any
 from urllib.parse import parse_qs, urlparse
 
-import aiohttp
+if TYPE_CHECKING:
+    import aiohttp
 
 # ---------------------------------------------------------------------------
 # Azure AD B2C / OAuth constants
@@ -29,15 +38,566 @@ _CONFIRMED_URL = f"{_TENANT_HOST}{_TENANT_PATH}/api/CombinedSigninAndSignup/conf
 _KUB_TOKEN_PROXY = "https://www.kub.org/api/auth/v1/oauth2/v2.0/token/customer"
 _KUB_BASE = "https://www.kub.org"
 
+# Background refresh runs this long before the next poll, minus up to
+# _REFRESH_JITTER seconds so many instances don't refresh in lockstep.
+_REFRESH_LEAD = timedelta(minutes=5)
+_REFRESH_JITTER = 60
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _default_json_loads():
+    """Prefer orjson (shipped with Home Assistant), else the stdlib decoder."""
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return _json.loads
+    return orjson.loads
+
+
+# Decoder applied to raw response bytes. Replace with set_json_loads.
+json_loads = _default_json_loads()
+
+
+def set_json_loads(loads) -> None:
+    """Use a different JSON decoder; it must accept bytes and return objects."""
+    global json_loads  # pylint: disable=global-statement
+    json_loads = loads
+
+
+# Usage responses at least this many bytes are decoded and normalized off the
+# event loop. Smaller ones cost less to parse than a thread handoff does.
+OFFLOAD_THRESHOLD = 64 * 1024
+
+
+async def _run_in_thread(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+# Runs func(*args) in a worker and returns its result. Replace with
+# set_executor, e.g. with hass.async_add_executor_job under Home Assistant.
+_executor_job = _run_in_thread
+
+
+def set_executor(executor_job, threshold: int | None = None) -> None:
+    """Use a different executor hook for parsing large usage responses.
+
+    executor_job(func, *args) must return an awaitable for the result.
+    threshold, when given, replaces OFFLOAD_THRESHOLD.
+    """
+    global _executor_job, OFFLOAD_THRESHOLD  # pylint: disable=global-statement
+    _executor_job = executor_job
+    if threshold is not None:
+        OFFLOAD_THRESHOLD = threshold
+
+
+class TokenBucket:
+    """Token bucket rate limiter for async callers.
+
+    Each acquire takes one token, refilled at rate tokens per second up to
+    burst. Callers that find the bucket empty take the token on credit and
+    sleep until it would have been refilled, so waiters are served in order
+    without a lock and the limiter works from any event loop.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.configure(rate, burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.delayed = 0
+        self.queued_seconds = 0.0
+        self.max_queued_seconds = 0.0
+
+    def configure(self, rate: float, burst: int) -> None:
+        """Change the sustained rate (per second) and burst size."""
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self._tokens -= 1
+        self.requests += 1
+        if self._tokens < 0:
+            wait = -self._tokens / self.rate
+            self.delayed += 1
+            self.queued_seconds += wait
+            self.max_queued_seconds = max(self.max_queued_seconds, wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Hand the credit back so a cancelled waiter doesn't delay the rest
+                self._tokens += 1
+                raise
+
+    def stats(self) -> dict[str, float]:
+        """Request count and time spent queued since creation."""
+        return {
+            "requests": self.requests,
+            "delayed": self.delayed,
+            "queued_seconds": round(self.queued_seconds, 3),
+            "max_queued_seconds": round(self.max_queued_seconds, 3),
+        }
+
+
+# Process-wide budgets: one for the B2C login and token endpoints, where bursts
+# risk account lockout, and a more generous one for the data APIs.
+AUTH_LIMITER = TokenBucket(rate=1.0, burst=8)
+API_LIMITER = TokenBucket(rate=5.0, burst=10)
+
+
+def configure_rate_limits(
+    auth_rate: float | None = None,
+    auth_burst: int | None = None,
+    api_rate: float | None = None,
+    api_burst: int | None = None,
+) -> None:
+    """Adjust the process-wide request budgets."""
+    AUTH_LIMITER.configure(
+        auth_rate or AUTH_LIMITER.rate, auth_burst or AUTH_LIMITER.burst
+    )
+    API_LIMITER.configure(
+        api_rate or API_LIMITER.rate, api_burst or API_LIMITER.burst
+    )
+
+
+def rate_limit_stats() -> dict[str, dict[str, float]]:
+    """Metrics for both request budgets."""
+    return {"auth": AUTH_LIMITER.stats(), "api": API_LIMITER.stats()}
+
 
 def _pkce_pair() -> tuple[str, str]:
     """Generate a PKCE code_verifier and code_challenge (S256)."""
+    import base64  # pylint: disable=import-outside-toplevel
+    import hashlib  # pylint: disable=import-outside-toplevel
+    import secrets  # pylint: disable=import-outside-toplevel
+
     verifier = secrets.token_urlsafe(64)
     digest = hashlib.sha256(verifier.encode()).digest()
     challenge = base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
     return verifier, challenge
 
 
+def _split_read_datetime(read_datetime: str) -> tuple[str, str]:
+    """Split a readDateTime into its %Y-%m-%d and %H:%M:%S keys."""
+    # KUB sends naive "YYYY-MM-DDTHH:MM:SS" values; slice those directly and
+    # only pay for full ISO parsing when the format is something else.
+    if len(read_datetime) == 19 and read_datetime[10] == "T":
+        return read_datetime[:10], read_datetime[11:]
+    parsed = datetime.fromisoformat(read_datetime)
+    return parsed.strftime("%Y-%m-%d"), parsed.strftime("%H:%M:%S")
+
+
+def _iter_usage(json):
+    """Yield (date, time, hourly record) for each hourly entry in a document.
+
+    KUB returns a flat list where each day is announced by an aggregate entry
+    (one with usageValuesChildren) followed by its hourly entries. Hours are
+    filed under the date of the aggregate before them, not their own stamp, so
+    a day's last reading stamped T00:00:00 of the next day stays in its day.
+    The cost and reading for each entry live at the same index in
+    usage-aggregate. Only the fields used downstream are copied out of the
+    document, one hour at a time, so callers can stream records without
+    building the whole day tree first.
+    """
+    aggregates = json["usage-aggregate"]
+    date = None
+    for idx, usage in enumerate(json["usage-value"]):
+        read_datetime = usage["readDateTime"]
+        if usage["usageValuesChildren"]:
+            # Day aggregates announce the date of the hours that follow
+            date, _time = _split_read_datetime(read_datetime)
+            continue
+        if date is None:
+            # Hours before any day aggregate have no day to belong to
+            continue
+        _day, time = _split_read_datetime(read_datetime)
+        # Grab the usage object via index
+        data = aggregates[idx]
+        yield date, time, {
+            "id": usage["id"],
+            "readDateTime": read_datetime,
+            "utilityUsed": data["readValue"],
+            "uom": data["uom"],
+            "cost": data["cost"],
+        }
+
+
+def _parse_usage(json) -> dict[str, dict[str, dict]]:
+    """Normalize a usage-values document into {date: {time: hourly record}}."""
+    days: dict[str, dict[str, dict]] = {}
+    for date, time, record in _iter_usage(json):
+        hours = days.get(date)
+        if hours is None:
+            hours = days[date] = {}
+        hours[time] = record
+    return days
+
+
+def _decode_usage(body: bytes) -> dict[str, dict[str, dict]]:
+    """Decode and normalize a raw usage-values response."""
+    return _parse_usage(json_loads(body))
+
+
+async def _load_usage(body: bytes) -> dict[str, dict[str, dict]]:
+    """Decode a usage response, in the executor when it is large.
+
+    The decoders hold the GIL, so this doesn't parse any faster; it keeps the
+    event loop responsive while a long range or many accounts are parsed.
+    """
+    if len(body) >= OFFLOAD_THRESHOLD:
+        return await _executor_job(_decode_usage, body)
+    return _decode_usage(body)
+
+
+def _date_range(start_date: str, end_date: str) -> list[str]:
+    """Every %Y-%m-%d date from start_date through end_date."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    days = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+    return [
+        (start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days + 1)
+    ]
+
+
+def _contiguous_spans(dates: list[str]) -> list[tuple[str, str]]:
+    """Group sorted %Y-%m-%d dates into (first, last) runs of consecutive days."""
+    spans: list[tuple[str, str]] = []
+    for date in dates:
+        if spans:
+            first, last = spans[-1]
+            following = datetime.strptime(last, "%Y-%m-%d") + timedelta(days=1)
+            if following.strftime("%Y-%m-%d") == date:
+                spans[-1] = (first, date)
+                continue
+        spans.append((date, date))
+    return spans
+
+
+# Keys that may carry a service point's read dates in the include=all account
+# document. KUB doesn't publish its schema, so several spellings are accepted.
+_CYCLE_START_KEYS = (
+    "billingPeriodStartDate",
+    "cycleStartDate",
+    "lastReadDate",
+    "previousReadDate",
+)
+_CYCLE_END_KEYS = (
+    "billingPeriodEndDate",
+    "cycleEndDate",
+    "nextReadDate",
+    "scheduledReadDate",
+)
+
+
+def _find_date(record: Mapping, keys: tuple[str, ...]) -> str | None:
+    """Return the first of keys in record holding an ISO date, as %Y-%m-%d."""
+    for key in keys:
+        value = record.get(key)
+        if not isinstance(value, str):
+            continue
+        try:
+            return datetime.strptime(value[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _references(record: Mapping, service_id: str) -> bool:
+    """True when record links to service_id, directly or in a nested mapping."""
+    for value in record.values():
+        if value == service_id or (isinstance(value, list) and service_id in value):
+            return True
+        if isinstance(value, Mapping) and _references(value, service_id):
+            return True
+    return False
+
+
+# Cycles starting longer ago than this are treated as unknown; KUB reads
+# meters roughly monthly, so such a date belongs to an old bill
+_MAX_CYCLE_DAYS = 62
+
+
+def _current_cycle(
+    periods: list[tuple[str, str | None]], today: str
+) -> dict[str, str | None] | None:
+    """Pick the current cycle from (start, end) periods, whatever their order.
+
+    The period covering today with the latest start wins. When every period
+    has ended, the current cycle is taken to begin where the latest one
+    ended, as the read closing one cycle opens the next.
+    """
+    periods = [
+        (start, end)
+        for start, end in periods
+        if start <= today and (end is None or end >= start)
+    ]
+    current = [(start, end) for start, end in periods if end is None or end >= today]
+    if current:
+        start, end = max(current, key=lambda period: (period[0], period[1] or ""))
+    elif periods:
+        start, end = max(end for _start, end in periods), None
+    else:
+        return None
+    oldest = (
+        datetime.strptime(today, "%Y-%m-%d") - timedelta(days=_MAX_CYCLE_DAYS)
+    ).strftime("%Y-%m-%d")
+    if start < oldest:
+        return None
+    return {"start": start, "end": end}
+
+
+def _billing_cycles(json: dict) -> dict[str, dict[str, str | None]]:
+    """Extract {service point id: {"start", "end"}} of the current billing cycles.
+
+    Each record describing a service point (the point itself, the mappings
+    nested in it and any other record in the document linking to it) gives
+    one period from its own start and end keys, and the current cycle is
+    picked from those. Service points without one are left out.
+    """
+    today = datetime.today().strftime("%Y-%m-%d")
+    records = [
+        record
+        for value in json.values()
+        if isinstance(value, list)
+        for record in value
+        if isinstance(record, Mapping)
+    ]
+    cycles = {}
+    for service in json.get("service-point", []):
+        service_id = service.get("id")
+        candidates = [service]
+        candidates.extend(v for v in service.values() if isinstance(v, Mapping))
+        candidates.extend(
+            record
+            for record in records
+            if record is not service and _references(record, service_id)
+        )
+        periods = []
+        for record in candidates:
+            start = _find_date(record, _CYCLE_START_KEYS)
+            if start is not None:
+                periods.append((start, _find_date(record, _CYCLE_END_KEYS)))
+        if (cycle := _current_cycle(periods, today)) is not None:
+            cycles[service_id] = cycle
+    return cycles
+
+
+class UsageCache:
+    """Day-level cache of normalized usage, plus coalescing of in-flight requests.
+
+    KUB publishes hourly reads with roughly a day's delay, so a day is treated
+    as closed once it is older than yesterday and has a full set of hours.
+    Closed days never expire; today and days still filling in are kept for a
+    short TTL so overlapping range queries within a poll are answered locally.
+    """
+
+    def __init__(
+        self,
+        today_ttl: timedelta = timedelta(minutes=15),
+        open_ttl: timedelta = timedelta(hours=1),
+        max_days: int = 2000,
+    ) -> None:
+        self.today_ttl = today_ttl
+        self.open_ttl = open_ttl
+        self.max_days = max_days
+        # (service point, utility type, date) -> (expires at or None, hours)
+        self._days: dict[tuple[str, str, str], tuple[datetime | None, dict]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def get(self, service_point: str, utility_type: str, date: str) -> dict | None:
+        """Return the cached hours for a day, or None when missing or expired."""
+        entry = self._days.get((service_point, utility_type, date))
+        if entry is None:
+            return None
+        expires, hours = entry
+        if expires is not None and datetime.now() >= expires:
+            del self._days[(service_point, utility_type, date)]
+            return None
+        return hours
+
+    def put(self, service_point: str, utility_type: str, date: str, hours: dict):
+        """Cache the hours for a day with a TTL matching how settled it is."""
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+        if date >= today:
+            expires: datetime | None = now + self.today_ttl
+        elif date < yesterday and len(hours) >= 23:
+            # 23 rather than 24 so the short day at the DST change closes too
+            expires = None
+        else:
+            expires = now + self.open_ttl
+        key = (service_point, utility_type, date)
+        self._days.pop(key, None)
+        self._days[key] = (expires, hours)
+        while len(self._days) > self.max_days:
+            # Oldest insertion first; long backfills don't pin memory forever
+            del self._days[next(iter(self._days))]
+
+    def clear(self) -> None:
+        """Forget every cached day."""
+        self._days.clear()
+
+    async def coalesce(self, key: str, fetch):
+        """Run fetch() once for concurrent callers asking for the same key."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class _DerivedDay(Mapping):
+    """Read-only {time: hourly record} for one day of a derived service."""
+
+    __slots__ = ("_hours", "_multiplier", "_rate")
+
+    def __init__(self, hours: dict, multiplier: float, rate: float | None) -> None:
+        self._hours = hours
+        self._multiplier = multiplier
+        self._rate = rate
+
+    def __getitem__(self, time: str) -> dict:
+        hour = self._hours[time]
+        used = hour["utilityUsed"] * self._multiplier
+        if self._rate is None:
+            cost = hour["cost"] * self._multiplier
+        else:
+            cost = used * self._rate
+        return {**hour, "utilityUsed": used, "cost": cost}
+
+    def __iter__(self):
+        return iter(self._hours)
+
+    def __len__(self) -> int:
+        return len(self._hours)
+
+
+class WastewaterView(Mapping):
+    """Wastewater usage derived from the water series of a combined W/S service.
+
+    KUB bills sewer from the water meter when both share a service point, so
+    nothing is copied: days and hours are read straight from the water dict.
+    With the default multiplier of 1 and no rate the water day dicts are
+    returned as they are; otherwise each hour is scaled when it is read, and
+    rate (dollars per unit) replaces the scaled water cost when given.
+    """
+
+    def __init__(
+        self, water: dict, multiplier: float = 1.0, rate: float | None = None
+    ) -> None:
+        self._water = water
+        self.multiplier = multiplier
+        self.rate = rate
+
+    @property
+    def is_identity(self) -> bool:
+        """True when wastewater reads exactly like water."""
+        return self.multiplier == 1 and self.rate is None
+
+    def __getitem__(self, date: str):
+        hours = self._water[date]
+        if self.is_identity:
+            return hours
+        return _DerivedDay(hours, self.multiplier, self.rate)
+
+    def __iter__(self):
+        return iter(self._water)
+
+    def __len__(self) -> int:
+        return len(self._water)
+
+    def totals(self, usage: float | None, cost: float | None) -> dict:
+        """Derive monthly totals from the water totals."""
+        if usage is None:
+            return {"usage": usage, "cost": cost}
+        derived = usage * self.multiplier
+        if self.rate is not None:
+            return {"usage": derived, "cost": derived * self.rate}
+        return {
+            "usage": derived,
+            "cost": None if cost is None else cost * self.multiplier,
+        }
+
+    def cycle_totals(self, totals: dict) -> dict:
+        """Derive billing cycle totals from the water cycle totals."""
+        return {**totals, **self.totals(totals["usage"], totals["cost"])}
+
+
+# ResponseCache.get default telling a missing entry from a cached None
+_MISSING = object()
+
+
+class ResponseCache:
+    """ETag/Last-Modified validators and parsed bodies per URL, plus counters.
+
+    A URL answered with a validator is remembered along with its parsed
+    body, so a 304 Not Modified on the next request is served from here.
+    Byte counts use Content-Length (the compressed size on the wire) when the
+    server sends it, and the decoded body length otherwise.
+    """
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        # url -> (etag, last modified, parsed body)
+        self._entries: dict[str, tuple[str | None, str | None, Any]] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+    def validators(self, url: str) -> dict[str, str]:
+        """Conditional request headers for a URL."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _value = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def get(self, url: str, default: Any = None) -> Any:
+        """The parsed body stored for a URL, or default once it's evicted."""
+        entry = self._entries.get(url)
+        return default if entry is None else entry[2]
+
+    def put(
+        self, url: str, etag: str | None, last_modified: str | None, value: Any
+    ) -> None:
+        """Remember a response that carried validators."""
+        self._entries.pop(url, None)
+        self._entries[url] = (etag, last_modified, value)
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def record(self, received: int, decoded: int, not_modified: bool) -> None:
+        """Count a completed request."""
+        self.requests += 1
+        self.not_modified += not_modified
+        self.bytes_received += received
+        self.bytes_decoded += decoded
+
+    def stats(self) -> dict[str, int]:
+        """Cumulative request and byte counts."""
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_received": self.bytes_received,
+            "bytes_decoded": self.bytes_decoded,
+        }
+
+
 class HTTPError(BaseException):
     """Raised when an HTTP operation fails."""
 
@@ -74,7 +634,16 @@ class Http:
         self,
         access_token: str = "",
         session_cookies: dict[str, str] | None = None,
+        session: aiohttp.ClientSession | None = None,
+        response_cache: ResponseCache | None = None,
+        conditional: bool = True,
     ) -> None:
+        # A caller supplied session is shared, so it is never closed here
+        self._shared_session = session
+        self.response_cache = response_cache or ResponseCache()
+        # Without it bodies aren't kept for 304s; exports and repairs read
+        # each range once, and keeping their chunks would defeat streaming
+        self.conditional = conditional
         self._session: aiohttp.ClientSession | None = None
         self.access_token = access_token
         # Cookies returned by the KUB token proxy (id_token, refresh_token, …)
@@ -83,7 +652,8 @@ class Http:
     def _build_cookie_header(self) -> str:
         return "; ".join(f"{k}={v}" for k, v in self.session_cookies.items())
 
-    async def __aenter__(self):
+    def _auth_headers(self) -> dict[str, str]:
+        # Built per request so a token refreshed mid-session is picked up
         headers: dict[str, str] = {}
         if self.session_cookies:
             # Cookie-based auth: send all proxy-issued cookies
@@ -91,36 +661,86 @@ class Http:
         elif self.access_token:
             # Fallback: Bearer token (works for /api/auth/v1/ but not /api/ami/v1/)
             headers["Authorization"] = f"Bearer {self.access_token}"
-        self._session = aiohttp.ClientSession(
-            headers=headers,
-            cookie_jar=aiohttp.DummyCookieJar(),
-            timeout=aiohttp.ClientTimeout(total=10),
-        )
+        return headers
+
+    async def __aenter__(self):
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        if self._shared_session is not None:
+            self._session = self._shared_session
+        else:
+            self._session = aiohttp.ClientSession(
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
         return self
 
     async def __aexit__(self, *err):
-        if self._session:
+        if self._session and self._session is not self._shared_session:
             await self._session.close()
         self._session = None
 
-    async def fetch(self, url):
+    async def fetch(self, url, headers: dict | None = None):
         """http get"""
         assert self._session is not None
-        resp = await self._session.get(url)
-        resp.raise_for_status()
+        await API_LIMITER.acquire()
+        resp = await self._session.get(
+            url, headers={**self._auth_headers(), **(headers or {})}
+        )
+        if resp.status != 304:
+            resp.raise_for_status()
         return resp
 
+    async def fetch_json(self, url):
+        """http get, decoding the raw body with the configured JSON decoder"""
+        return await self.fetch_parsed(url, json_loads)
+
+    async def fetch_parsed(self, url, parse):
+        """Conditional http get, returning parse(body) or the cached value on 304.
+
+        parse receives the raw body and may be a coroutine function.
+        """
+        cache = self.response_cache
+        if not self.conditional:
+            resp = await self.fetch(url)
+        else:
+            resp = await self.fetch(url, cache.validators(url))
+            if resp.status == 304:
+                resp.release()
+                cache.record(0, 0, not_modified=True)
+                value = cache.get(url, _MISSING)
+                if value is not _MISSING:
+                    return value
+                # Evicted since the validators were sent, so ask again in full
+                resp = await self.fetch(url)
+        body = await resp.read()
+        cache.record(resp.content_length or len(body), len(body), not_modified=False)
+        value = parse(body)
+        if asyncio.iscoroutine(value):
+            value = await value
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if self.conditional and (etag or last_modified):
+            cache.put(url, etag, last_modified, value)
+        return value
+
     async def post(self, url, payload):
         """HTTP post (JSON body)"""
         assert self._session is not None
-        resp = await self._session.post(url, json=payload)
+        await API_LIMITER.acquire()
+        resp = await self._session.post(
+            url, json=payload, headers=self._auth_headers()
+        )
         resp.raise_for_status()
         return resp
 
     async def post_form(self, url, data: dict, headers: dict | None = None):
         """HTTP post (form-encoded body)"""
         assert self._session is not None
-        resp = await self._session.post(url, data=data, headers=headers or {})
+        await API_LIMITER.acquire()
+        resp = await self._session.post(
+            url, data=data, headers={**self._auth_headers(), **(headers or {})}
+        )
         resp.raise_for_status()
         return resp
 
@@ -128,9 +748,17 @@ class Http:
 class KubUtility:
     """KUB utilities api"""
 
-    def __init__(self, username, password):
+    def __init__(
+        self,
+        username,
+        password,
+        session: aiohttp.ClientSession | None = None,
+    ):
         self.username = username
         self.password = password
+        # Optional caller-owned session shared by every request this instance
+        # makes. It must use a DummyCookieJar since cookies are sent manually.
+        self.session = session
         self.person_id = ""
         self.account_id = ""
 
@@ -151,9 +779,77 @@ class KubUtility:
             "water": {"usage": None, "cost": None},
             "wastewater": {"usage": None, "cost": None},
         }
+        # Usage and cost since the start of each service's billing cycle, for
+        # service points whose cycle is described in the account document
+        self.cycle_total = {
+            utility: {"usage": None, "cost": None, "start": None, "end": None}
+            for utility in self.monthly_total
+        }
+        # {service point id: {"start", "end"}} from the account document
+        self.billing_cycles: dict[str, dict[str, str | None]] = {}
+        self._cycles_checked = ""
         self.services = {}
         self.service_list = []
-        self.http: Http | None = None
+        # Applied when wastewater is derived from a combined W/S service point
+        self.wastewater_multiplier = 1.0
+        self.wastewater_rate: float | None = None
+        # When each service's usage was last fetched successfully
+        self.fetched_at: dict[str, datetime] = {}
+        # Http wrappers currently open, so a refreshed session reaches them all
+        self._open_http: set[Http] = set()
+        # Serializes logins/refreshes between polls and the background task
+        self._token_lock = asyncio.Lock()
+        # Shared by every range query so overlapping ranges fetch only new days
+        self.usage_cache = UsageCache()
+        # Validators for conditional requests and transfer counters
+        self.response_cache = ResponseCache()
+        # Requests and bytes of the latest retrieve_last_31_days
+        self.last_poll_transfer: dict[str, int] = {}
+        self._refresh_task: asyncio.Task | None = None
+        # When the scheduled background refresh runs
+        self._refresh_due: datetime | None = None
+
+    @asynccontextmanager
+    async def _http(self, conditional: bool = True):
+        """Yield an open Http wrapper carrying the current session state.
+
+        Each operation gets its own wrapper and passes it down explicitly, so
+        a poll, an export and a repair can run side by side. Only polling
+        wrappers are conditional, as they re-request the same URLs.
+        """
+        http = Http(
+            self._access_token,
+            session_cookies=self._session_cookies,
+            session=self.session,
+            response_cache=self.response_cache,
+            conditional=conditional,
+        )
+        self._open_http.add(http)
+        try:
+            async with http:
+                yield http
+        finally:
+            self._open_http.discard(http)
+
+    def _propagate_session(self) -> None:
+        """Hand new session cookies / token to every open Http wrapper."""
+        for http in self._open_http:
+            http.session_cookies = self._session_cookies
+            http.access_token = self._access_token
+
+    @asynccontextmanager
+    async def _client_session(self, timeout: int):
+        """Yield the shared session, or a short-lived one for a single exchange."""
+        if self.session is not None:
+            yield self.session
+            return
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            cookie_jar=aiohttp.DummyCookieJar(),
+        ) as session:
+            yield session
 
     @property
     def is_session_active(self) -> bool:
@@ -181,18 +877,17 @@ class KubUtility:
         The KUB proxy's cookies (id_token, refresh_token, …) are then forwarded
         on every subsequent request to www.kub.org instead of a Bearer header.
         """
+        import re  # pylint: disable=import-outside-toplevel
+        import secrets  # pylint: disable=import-outside-toplevel
+
         verifier, challenge = _pkce_pair()
         state = secrets.token_urlsafe(16)
 
-        timeout = aiohttp.ClientTimeout(total=30)
         # Use DummyCookieJar to disable aiohttp's automatic cookie handling.
         # aiohttp silently drops cookies whose names contain colons (e.g.
         # x-ms-cpim-sso:kubb2cprd.onmicrosoft.com_0), which are required by
         # Azure AD B2C. We collect Set-Cookie headers manually and replay them.
-        async with aiohttp.ClientSession(
-            timeout=timeout,
-            cookie_jar=aiohttp.DummyCookieJar(),
-        ) as session:
+        async with self._client_session(timeout=30) as session:
             # ----------------------------------------------------------
             # Step 1 – GET authorize page to seed cookies & CSRF token
             # ----------------------------------------------------------
@@ -205,6 +900,7 @@ class KubUtility:
                 "code_challenge": challenge,
                 "code_challenge_method": "S256",
             }
+            await AUTH_LIMITER.acquire()
             async with session.get(_AUTHORIZE_URL, params=params) as resp:
                 if resp.status != 200:
                     raise KUBAuthenticationError(
@@ -253,6 +949,7 @@ class KubUtility:
                 "logonIdentifier": self.username,
                 "password": self.password,
             }
+            await AUTH_LIMITER.acquire()
             async with session.post(
                 _SELF_ASSERTED_URL,
                 params=self_asserted_params,
@@ -273,10 +970,9 @@ class KubUtility:
                         f"(HTTP {sa_resp.status}). The B2C policy or endpoint "
                         f"may have changed."
                     )
-                import json as _json
                 try:
-                    sa_json = _json.loads(sa_text)
-                except _json.JSONDecodeError as exc:
+                    sa_json = json_loads(sa_text)
+                except ValueError as exc:
                     raise KUBAuthenticationError(
                         f"SelfAsserted endpoint returned non-JSON "
                         f"(HTTP {sa_resp.status}): {sa_text[:200]}"
@@ -295,6 +991,7 @@ class KubUtility:
             }
             # The confirmed endpoint redirects to redirect_uri with ?code=...
             # We must NOT follow the redirect so we can intercept the code.
+            await AUTH_LIMITER.acquire()
             async with session.get(
                 _CONFIRMED_URL,
                 params=confirmed_params,
@@ -333,6 +1030,7 @@ class KubUtility:
                 "Origin": _KUB_BASE,
                 "Referer": f"{_KUB_BASE}/auth-callback",
             }
+            await AUTH_LIMITER.acquire()
             async with session.post(
                 _KUB_TOKEN_PROXY,
                 data=token_data,
@@ -348,6 +1046,7 @@ class KubUtility:
                         "code_verifier": verifier,
                         "scope": _SCOPE,
                     }
+                    await AUTH_LIMITER.acquire()
                     async with session.post(_TOKEN_URL, data=fallback_data) as fb_resp:
                         if fb_resp.status != 200:
                             body = await fb_resp.text()
@@ -395,9 +1094,7 @@ class KubUtility:
                     self.session_start = datetime.now()
 
                     # Propagate new session state to any active Http instance
-                    if self.http is not None:
-                        self.http.session_cookies = self._session_cookies
-                        self.http.access_token = self._access_token
+                    self._propagate_session()
                     return
 
         expires_in = int(token_json.get("expires_in", 3600)
@@ -406,9 +1103,7 @@ class KubUtility:
         self.session_start = datetime.now()
 
         # Propagate new token to any active Http instance
-        if self.http is not None:
-            self.http.session_cookies = self._session_cookies
-            self.http.access_token = self._access_token
+        self._propagate_session()
 
     async def _refresh_access_token(self):
         """Refresh the session using the KUB token proxy (cookie-based) or refresh token."""
@@ -421,10 +1116,8 @@ class KubUtility:
                 "client_id": _CLIENT_ID,
                 "grant_type": "refresh_token",
             }
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=15),
-                cookie_jar=aiohttp.DummyCookieJar(),
-            ) as session:
+            async with self._client_session(timeout=15) as session:
+                await AUTH_LIMITER.acquire()
                 async with session.post(
                     _KUB_TOKEN_PROXY,
                     data=token_data,
@@ -453,8 +1146,7 @@ class KubUtility:
             expires_in = int((token_json or {}).get(
                 "expires_in", 3600)) if token_json else 3600
             self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
-            if self.http is not None:
-                self.http.session_cookies = self._session_cookies
+            self._propagate_session()
             return
 
         if not self._refresh_token:
@@ -468,9 +1160,8 @@ class KubUtility:
             "refresh_token": self._refresh_token,
             "scope": _SCOPE,
         }
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=15)
-        ) as session:
+        async with self._client_session(timeout=15) as session:
+            await AUTH_LIMITER.acquire()
             async with session.post(_TOKEN_URL, data=token_data) as token_resp:
                 if token_resp.status != 200:
                     # Refresh token expired – fall back to full login
@@ -484,62 +1175,160 @@ class KubUtility:
             "refresh_token", self._refresh_token)
         expires_in = int(token_json.get("expires_in", 3600))
         self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
-
-        if self.http is not None:
-            self.http.access_token = self._access_token
+        self._propagate_session()
 
     async def _ensure_token(self):
         """Ensure we have a valid session (cookies or token), refreshing as needed."""
-        if not self.is_session_active:
-            if self._session_cookies or self._refresh_token:
-                await self._refresh_access_token()
-            else:
-                await self._retrieve_access_token()
+        async with self._token_lock:
+            if not self.is_session_active:
+                if self._session_cookies or self._refresh_token:
+                    await self._refresh_access_token()
+                else:
+                    await self._retrieve_access_token()
+
+    def start_token_refresh(self, next_use: timedelta) -> None:
+        """Refresh the session in the background shortly before its next use.
 
-    async def _retrieve_account_info(self):
+        Call after each poll with the time until the next one, so that poll
+        rarely pays for a refresh or re-login inline. Nothing is scheduled
+        when the session outlives next_use or next_use is too close, and a
+        refresh already due sooner is kept. Call stop_token_refresh when done
+        with the instance.
+        """
+        import random  # pylint: disable=import-outside-toplevel
+
+        now = datetime.now()
+        use_at = now + next_use
+        if (
+            self._token_expires_at is not None
+            and self._token_expires_at - _REFRESH_LEAD >= use_at
+        ):
+            return
+        jitter = timedelta(seconds=random.uniform(0, _REFRESH_JITTER))
+        due = use_at - _REFRESH_LEAD - jitter
+        if due <= now:
+            return
+        task = self._refresh_task
+        if task is not None and not task.done():
+            if self._refresh_due is not None and self._refresh_due <= due:
+                return
+            task.cancel()
+        self._refresh_due = due
+        self._refresh_task = asyncio.get_running_loop().create_task(
+            self._background_refresh(due, use_at)
+        )
+
+    async def stop_token_refresh(self):
+        """Cancel the background refresh task, if scheduled."""
+        task, self._refresh_task = self._refresh_task, None
+        self._refresh_due = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _background_refresh(self, due: datetime, use_at: datetime) -> None:
+        """Refresh the session at due unless it already lasts until use_at."""
+        await asyncio.sleep((due - datetime.now()).total_seconds())
+        try:
+            async with self._token_lock:
+                # A poll may have refreshed while we slept
+                if (
+                    self._token_expires_at is None
+                    or self._token_expires_at - _REFRESH_LEAD < use_at
+                ):
+                    if self._session_cookies or self._refresh_token:
+                        await self._refresh_access_token()
+                    else:
+                        await self._retrieve_access_token()
+        except KUBAuthenticationError as err:
+            # Leave it to the next poll to surface bad credentials
+            _LOGGER.warning("Background KUB session refresh failed: %s", err)
+        except (Exception, HTTPError) as err:  # pylint: disable=broad-except
+            # The next poll refreshes inline instead
+            _LOGGER.debug("Background KUB session refresh failed: %s", err)
+
+    async def _retrieve_account_info(self, http: Http):
         """Retrieve Account Info"""
-        assert self.http is not None
         if not self.account_id:
-            response = await self.http.fetch(
+            json = await http.fetch_json(
                 f"https://www.kub.org/api/auth/v1/users/{self.username}"
             )
-            json = await response.json()
             self.person_id = json["person"][0]["id"]
             self.account_id = json["person"][0]["accounts"][0]
-        await self._retrieve_services()
+        await self._retrieve_services(http)
 
-    async def _retrieve_services(self):
-        assert self.http is not None
+    async def _retrieve_services(self, http: Http):
         url = f"https://www.kub.org/api/cis/v1/accounts/{self.account_id}?include=all"
-        response = await self.http.fetch(url)
-        json = await response.json()
+        json = await http.fetch_json(url)
         self.services = json["service-point"]
+        self.billing_cycles = _billing_cycles(json)
+        self._cycles_checked = datetime.today().strftime("%Y-%m-%d")
 
         for service in self.services:
             match service["type"]:
                 case "E-RES":
                     self.account["electricity"] = service["id"]
-                    self.service_list.append(KUBUtilityTypes.ELECTRICITY)
+                    self._add_service(KUBUtilityTypes.ELECTRICITY)
                 case "G-RES":
                     self.account["gas"] = service["id"]
-                    self.service_list.append(KUBUtilityTypes.GAS)
+                    self._add_service(KUBUtilityTypes.GAS)
                 case "W/S-RES":
                     self.account["water"] = service["id"]
+                    self.account.setdefault("wastewater", service["id"])
+                    self._add_service(KUBUtilityTypes.WATER)
+                    self._add_service(KUBUtilityTypes.WASTEWATER)
+                case "W-RES":
+                    self.account["water"] = service["id"]
+                    self._add_service(KUBUtilityTypes.WATER)
+                case "S-RES" | "WW-RES":
+                    # A sewer meter of its own replaces the derived series
                     self.account["wastewater"] = service["id"]
-                    self.service_list.append(KUBUtilityTypes.WATER)
-                    self.service_list.append(KUBUtilityTypes.WASTEWATER)
+                    self._add_service(KUBUtilityTypes.WASTEWATER)
                 case _:
                     raise ValueError(
                         f"An unexpected service type: {service['type']} (id: {service['id']})"
                     )
         return self.services
 
+    async def _refresh_billing_cycles(self, http: Http) -> None:
+        """Re-read the cycles, at most once a day, once a known cycle has ended.
+
+        Cycles with no known end are assumed over after 31 days. The account
+        document is otherwise only read at login, so polls stay the same size.
+        """
+        today = datetime.today().strftime("%Y-%m-%d")
+        if not self.billing_cycles or self._cycles_checked == today:
+            return
+        rollover = (datetime.today() - timedelta(days=31)).strftime("%Y-%m-%d")
+        if not any(
+            cycle["end"] < today if cycle["end"] else cycle["start"] < rollover
+            for cycle in self.billing_cycles.values()
+        ):
+            return
+        self._cycles_checked = today
+        url = f"https://www.kub.org/api/cis/v1/accounts/{self.account_id}?include=all"
+        self.billing_cycles = _billing_cycles(await http.fetch_json(url))
+
+    def _add_service(self, utility_type: KUBUtilityTypes) -> None:
+        if utility_type not in self.service_list:
+            self.service_list.append(utility_type)
+
+    @property
+    def wastewater_combined(self) -> bool:
+        """True when wastewater is billed from the water service point."""
+        wastewater = self.account.get("wastewater")
+        return wastewater is not None and wastewater == self.account.get("water")
+
     async def retrieve_account_info(self):
         """Retrieves account info from KUB api"""
-        await self._retrieve_access_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
-            await self._retrieve_account_info()
-        self.http = None
+        async with self._token_lock:
+            await self._retrieve_access_token()
+        async with self._http() as http:
+            await self._retrieve_account_info(http)
 
     async def retrieve_access_token(self):
         """Fetches access token"""
@@ -547,24 +1336,169 @@ class KubUtility:
 
     async def _retrieve_usage(
         self,
+        http: Http,
         utility_type,
-        start_date: str = datetime.today().strftime("%Y-%m-%d"),
-        end_date: str = datetime.today().strftime("%Y-%m-%d"),
-    ):
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> tuple[dict, dict, dict]:
+        """Fetch one metered service's days with its monthly and cycle totals.
+
+        Both dates default to today. Nothing is stored here, so a poll failing
+        part way leaves the last good usage and totals untouched.
+        """
+        today = datetime.today().strftime("%Y-%m-%d")
+        start_date = start_date or today
+        end_date = end_date or today
         utility = utility_type.name.lower()
         account = self.account[utility]
+        days = await self._usage_days(
+            http, utility_type, account, start_date, end_date
+        )
+        total = 0.0
+        total_cost = 0.0
+        current_month = datetime.now().strftime("%Y-%m")
+        cycle = self.billing_cycles.get(account)
+        cycle_start = cycle["start"] if cycle else None
+        cycle_usage = 0.0
+        cycle_cost = 0.0
+        if cycle_start is not None and cycle_start < start_date:
+            # The cycle began before the polled range. Its earlier days are
+            # closed, so the usage cache keeps them after the first fetch.
+            day_before = datetime.strptime(start_date, "%Y-%m-%d")
+            day_before -= timedelta(days=1)
+            earlier = await self._usage_days(
+                http,
+                utility_type,
+                account,
+                cycle_start,
+                day_before.strftime("%Y-%m-%d"),
+            )
+            for hours in earlier.values():
+                for usage_data in hours.values():
+                    cycle_usage = usage_data["utilityUsed"] + cycle_usage
+                    cycle_cost = usage_data["cost"] + cycle_cost
+        fetched = {}
+        for date, hours in days.items():
+            if not hours:
+                continue
+            fetched[date] = hours
+            in_month = date[:7] == current_month
+            in_cycle = cycle_start is not None and date >= cycle_start
+            if not (in_month or in_cycle):
+                continue
+            for usage_data in hours.values():
+                if in_month:
+                    total = usage_data["utilityUsed"] + total
+                    total_cost = usage_data["cost"] + total_cost
+                if in_cycle:
+                    cycle_usage = usage_data["utilityUsed"] + cycle_usage
+                    cycle_cost = usage_data["cost"] + cycle_cost
+
+        self.fetched_at[utility] = datetime.now().astimezone()
+        return (
+            fetched,
+            {"usage": total, "cost": total_cost},
+            {
+                "usage": cycle_usage if cycle else None,
+                "cost": cycle_cost if cycle else None,
+                "start": cycle_start,
+                "end": cycle["end"] if cycle else None,
+            },
+        )
+
+    async def _retrieve_all_usage(
+        self, http: Http, start_date: str, end_date: str | None = None
+    ):
+        """Fetch every metered service concurrently, then derive the rest.
 
-        # If we are processing wastewater so just copy water
-        # This does not account for separate meters for water and wastewater
-        # However, I do not know what the response looks like to process
-        # this case properly
-        if utility_type == KUBUtilityTypes.WASTEWATER:
-            water = KUBUtilityTypes.WATER.name.lower()
-            self.usage[utility] = copy.deepcopy(self.usage[water])
-            self.monthly_total[utility]["usage"] = self.monthly_total[water]["usage"]
-            self.monthly_total[utility]["cost"] = self.monthly_total[water]["cost"]
-            return self.usage
+        The usage and totals are replaced by new objects once every service
+        has been fetched, never updated in place.
+        """
+        end_date = end_date or datetime.today().strftime("%Y-%m-%d")
+        derived = [
+            service
+            for service in self.service_list
+            if service == KUBUtilityTypes.WASTEWATER and self.wastewater_combined
+        ]
+        metered = [service for service in self.service_list if service not in derived]
+        # Let every fetch finish so one failing service doesn't discard the
+        # others' cached days, then raise the first error
+        results = await asyncio.gather(
+            *(
+                self._retrieve_usage(http, service, start_date, end_date)
+                for service in metered
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        usage = dict(self.usage)
+        monthly_total = dict(self.monthly_total)
+        cycle_total = dict(self.cycle_total)
+        for service, (days, monthly, cycle) in zip(metered, results):
+            utility = service.name.lower()
+            previous = usage.get(utility)
+            if not isinstance(previous, dict):
+                previous = {}
+            usage[utility] = {**previous, **days}
+            monthly_total[utility] = monthly
+            cycle_total[utility] = cycle
+
+        # A combined W/S service point has no sewer reads of its own, so
+        # wastewater is a view over the water series rather than a copy
+        water = KUBUtilityTypes.WATER.name.lower()
+        for service in derived:
+            utility = service.name.lower()
+            view = WastewaterView(
+                usage[water], self.wastewater_multiplier, self.wastewater_rate
+            )
+            usage[utility] = view
+            monthly_total[utility] = view.totals(
+                monthly_total[water]["usage"], monthly_total[water]["cost"]
+            )
+            cycle_total[utility] = view.cycle_totals(cycle_total[water])
+            self.fetched_at[utility] = self.fetched_at.get(
+                water, datetime.now().astimezone()
+            )
+        self.usage = usage
+        self.monthly_total = monthly_total
+        self.cycle_total = cycle_total
 
+    async def _usage_days(
+        self, http: Http, utility_type, account, start_date, end_date, use_cache=True
+    ) -> dict[str, dict]:
+        """Return {date: hours} for a range, fetching only days not in the cache.
+
+        Missing days are requested as contiguous spans. With use_cache False the
+        cache is still read, but fetched days aren't added to it.
+        """
+        cache = self.usage_cache
+        days: dict[str, dict] = {}
+        missing = []
+        for date in _date_range(start_date, end_date):
+            hours = cache.get(account, utility_type.value, date)
+            if hours is None:
+                missing.append(date)
+            else:
+                days[date] = hours
+
+        for first, last in _contiguous_spans(missing):
+            fetched = await self._fetch_usage(
+                http, utility_type, account, first, last
+            )
+            for date in _date_range(first, last):
+                hours = fetched.get(date, {})
+                if use_cache:
+                    cache.put(account, utility_type.value, date, hours)
+                days[date] = hours
+        return dict(sorted(days.items()))
+
+    async def _fetch_usage(
+        self, http: Http, utility_type, account, start_date, end_date
+    ):
+        """Fetch and normalize usage-values for a service point"""
         url = (
             f"https://www.kub.org/api/ami/v1/usage-values"
             f"?endDate={end_date}"
@@ -574,66 +1508,28 @@ class KubUtility:
             f"&utilityType={utility_type.value}"
         )
 
-        assert self.http is not None
-        response = await self.http.fetch(url)
-        json = await response.json()
-        total = 0.0
-        total_cost = 0.0
-        date = ""
-        usage_data = {}
-        for idx, usage in enumerate(json["usage-value"]):
-            if len(usage["usageValuesChildren"]) == 0:
-                # Pull data from the base object
-                usage_data["id"] = usage["id"]
-                usage_data["readDateTime"] = usage["readDateTime"]
-
-                # Grab the usage object via index
-                data = json["usage-aggregate"][idx]
-
-                # Read data from the usage object
-                usage_data["utilityUsed"] = data["readValue"]
-                usage_data["uom"] = data["uom"]
-                usage_data["cost"] = data["cost"]
-
-                # Create another object with key of time
-                time = datetime.fromisoformat(usage["readDateTime"]).strftime(
-                    "%H:%M:%S"
-                )
-                self.usage[utility][date][time] = {}
-
-                # Apend all the data
-                self.usage[utility][date][time] = copy.deepcopy(usage_data)
-
-                if (
-                    datetime.fromisoformat(usage["readDateTime"]).month
-                    == datetime.now().month
-                ):
-                    total = data["readValue"] + total
-                    total_cost = data["cost"] + total_cost
-            else:
-                # This is the aggregate case so create a new blank object in the list
-                date = datetime.fromisoformat(usage["readDateTime"]).strftime(
-                    "%Y-%m-%d"
-                )
-                self.usage[utility][date] = {}
-
-        self.monthly_total[utility]["usage"] = total
-        self.monthly_total[utility]["cost"] = total_cost
-        return self.usage
+        return await self.usage_cache.coalesce(
+            url, lambda: http.fetch_parsed(url, _load_usage)
+        )
 
     async def retrieve_last_31_days(self):
         """Retrieve all usage for the last 31 days"""
         date = datetime.today() - timedelta(days=31)
         start_date = date.strftime("%Y-%m-%d")
+        before = self.response_cache.stats()
 
         await self._ensure_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
+        async with self._http() as http:
             if not self.person_id:
-                await self._retrieve_account_info()
+                await self._retrieve_account_info(http)
+            else:
+                await self._refresh_billing_cycles(http)
 
-            for service in self.service_list:
-                await self._retrieve_usage(service, start_date=start_date)
-        self.http = None
+            await self._retrieve_all_usage(http, start_date)
+        self.last_poll_transfer = {
+            key: value - before[key]
+            for key, value in self.response_cache.stats().items()
+        }
         return self.usage
 
     async def retrieve_monthly_usage(self):
@@ -641,46 +1537,85 @@ class KubUtility:
         start_date = datetime.today().replace(day=1).strftime("%Y-%m-%d")
 
         await self._ensure_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
+        async with self._http() as http:
             if not self.person_id:
-                await self._retrieve_account_info()
-            for service in self.service_list:
-                await self._retrieve_usage(service, start_date=start_date)
-        self.http = None
+                await self._retrieve_account_info(http)
+            await self._retrieve_all_usage(http, start_date)
         return self.usage
 
     async def retrieve_usage_by_range(
         self,
-        start_date: str = datetime.today().strftime("%Y-%m-%d"),
-        end_date: str = datetime.today().strftime("%Y-%m-%d"),
+        start_date: str | None = None,
+        end_date: str | None = None,
     ):
-        """Retrieve usage for a custom date range"""
+        """Retrieve usage for a custom date range, today by default"""
+        today = datetime.today().strftime("%Y-%m-%d")
+        start_date = start_date or today
+        end_date = end_date or today
         await self._ensure_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
+        async with self._http(conditional=False) as http:
             if not self.person_id:
-                await self._retrieve_account_info()
-            for service in self.service_list:
-                await self._retrieve_usage(
-                    service, start_date=start_date, end_date=end_date
-                )
-        self.http = None
+                await self._retrieve_account_info(http)
+            await self._retrieve_all_usage(http, start_date, end_date)
         return self.usage
 
+    async def iter_usage_by_range(
+        self,
+        start_date: str,
+        end_date: str,
+        chunk_days: int = 31,
+    ):
+        """Yield (utility, date, hours) for a date range, one chunk at a time.
+
+        Unlike retrieve_usage_by_range nothing is accumulated on the instance,
+        so memory use is bounded by a single chunk no matter how long the range
+        is. Days already in the usage cache are served from it. Wastewater is
+        only yielded for a sewer meter of its own; a combined W/S service
+        point would just repeat the water rows.
+        """
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        while start <= end:
+            chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+            await self._ensure_token()
+            # A wrapper of its own, as the caller may poll while this is suspended
+            async with self._http(conditional=False) as http:
+                if not self.person_id:
+                    await self._retrieve_account_info(http)
+                for service in self.service_list:
+                    if (
+                        service == KUBUtilityTypes.WASTEWATER
+                        and self.wastewater_combined
+                    ):
+                        continue
+                    utility = service.name.lower()
+                    days = await self._usage_days(
+                        http,
+                        service,
+                        self.account[utility],
+                        start.strftime("%Y-%m-%d"),
+                        chunk_end.strftime("%Y-%m-%d"),
+                        use_cache=False,
+                    )
+                    for date, hours in days.items():
+                        if hours:
+                            yield utility, date, hours
+            start = chunk_end + timedelta(days=1)
+
     async def retrieve_monthly_summary(self):
         """Retrieve summary of usage for the current month"""
         start_date = datetime.today().replace(day=1).strftime("%Y-%m-%d")
 
         await self._ensure_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
+        async with self._http() as http:
             if not self.person_id:
-                await self._retrieve_account_info()
-            for service in self.service_list:
-                await self._retrieve_usage(service, start_date=start_date)
-        self.http = None
+                await self._retrieve_account_info(http)
+            await self._retrieve_all_usage(http, start_date)
         return self.monthly_total
 
-    async def get_usage_by_datetime(self, usage_record: datetime = datetime.now()):
-        """Retrieve usage by datetime"""
+    async def get_usage_by_datetime(self, usage_record: datetime | None = None):
+        """Retrieve usage by datetime, now by default"""
+        usage_record = usage_record or datetime.now()
         await self.retrieve_monthly_usage()
         date_key = usage_record.replace(day=1).strftime("%Y-%m-%d")
         hour_key = usage_record.strftime("%H:00:00")
@@ -693,10 +1628,9 @@ class KubUtility:
     async def get_available_services(self):
         """Returns available services for account"""
         await self._ensure_token()
-        async with Http(self._access_token, session_cookies=self._session_cookies) as self.http:
+        async with self._http() as http:
             if not self.person_id:
-                await self._retrieve_account_info()
-        self.http = None
+                await self._retrieve_account_info(http)
         return self.services
 
     async def verify_access(self):
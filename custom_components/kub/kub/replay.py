@@ -0,0 +1,322 @@
+"""Record and replay KUB HTTP traffic
+
+Both classes stand in for the aiohttp.ClientSession passed to KubUtility, so
+every auth step and API call flows through them:
+
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as real:
+        session = RecordingSession(real, secrets=[username, password])
+        await KubUtility(username, password, session=session).retrieve_last_31_days()
+        session.save("kub_fixture.json.gz")
+
+    session = ReplaySession("kub_fixture.json.gz", secrets=[username], latency=0.05)
+    await KubUtility(username, "unused", session=session).retrieve_last_31_days()
+
+Recordings keep status, headers and body of every response in a gzipped JSON
+file. Cookie values, tokens, the given secrets and the identifying fields that
+diagnostics redact are dropped, and person, account, premise and service point
+ids are replaced by stable placeholders in URLs, keys and bodies alike, so a
+recording can be shared and still replays. Replay serves responses in recorded
+order per request, so runs are deterministic and need no network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import re
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .kub_utilities import HTTPError, json_loads
+
+REDACTED = "REDACTED"
+
+# Query parameters that change on every login and so can't be part of a key
+_VOLATILE_PARAMS = {"state", "code_challenge", "tx", "csrf_token", "code"}
+_TOKEN_FIELD = re.compile(r'"(id_token|access_token|refresh_token)"\s*:\s*"[^"]*"')
+# Same fields as TO_REDACT in the integration's diagnostics
+_REDACT_FIELDS = {"username", "password", "account", "locationDetails", "premise"}
+# Collections whose record ids, and fields whose values, identify the customer
+_ID_COLLECTIONS = {
+    "person": "person",
+    "account": "account",
+    "accounts": "account",
+    "premise": "premise",
+    "service-point": "service-point",
+}
+_ID_FIELDS = {
+    "personId": "person",
+    "accountId": "account",
+    "premiseId": "premise",
+    "servicePointId": "service-point",
+}
+
+
+def _with_params(url: str, params: dict | None) -> str:
+    if not params:
+        return url
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + [(k, str(v)) for k, v in params.items()]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _collect_ids(value, found: dict[str, str]) -> None:
+    """Add {id: kind} for every customer id in a decoded JSON document."""
+    if isinstance(value, list):
+        for item in value:
+            _collect_ids(item, found)
+        return
+    if not isinstance(value, dict):
+        return
+    for name, item in value.items():
+        if kind := _ID_COLLECTIONS.get(name):
+            for record in item if isinstance(item, list) else [item]:
+                if isinstance(record, dict):
+                    record = record.get("id")
+                if isinstance(record, (str, int)) and not isinstance(record, bool):
+                    found.setdefault(str(record), kind)
+        if (kind := _ID_FIELDS.get(name)) and isinstance(item, (str, int)):
+            found.setdefault(str(item), kind)
+        _collect_ids(item, found)
+
+
+def _redact_fields(value):
+    """Copy of a decoded JSON document with identifying fields redacted."""
+    if isinstance(value, list):
+        return [_redact_fields(item) for item in value]
+    if isinstance(value, dict):
+        return {
+            name: REDACTED if name in _REDACT_FIELDS else _redact_fields(item)
+            for name, item in value.items()
+        }
+    return value
+
+
+class _Response:
+    """The subset of aiohttp.ClientResponse used by the KUB library."""
+
+    def __init__(self, url: str, status: int, headers, body: bytes) -> None:
+        from multidict import (  # pylint: disable=import-outside-toplevel
+            CIMultiDict,
+            CIMultiDictProxy,
+        )
+
+        self.url = url
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+
+    @property
+    def content_length(self) -> int | None:
+        length = self.headers.get("Content-Length")
+        return int(length) if length else None
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode("utf-8", errors="replace")
+
+    async def json(self):
+        return json_loads(self._body) if self._body else None
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise HTTPError(self.status, f"HTTP {self.status} for {self.url}")
+
+    def release(self) -> None:
+        """Nothing to release; the body is already in memory."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *err):
+        return None
+
+
+class _RequestContext:
+    """Awaitable and async context manager, like aiohttp's request helpers."""
+
+    def __init__(self, coro) -> None:
+        self._coro = coro
+        self._response: _Response | None = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self) -> _Response:
+        self._response = await self._coro
+        return self._response
+
+    async def __aexit__(self, *err):
+        return None
+
+
+class _Transport(ABC):
+    """Shared request key and redaction rules."""
+
+    def __init__(self, secrets=()) -> None:
+        self._secrets = [secret for secret in secrets if secret]
+
+    def _redact(self, text: str) -> str:
+        for secret in self._secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    def _key(self, method: str, url: str) -> str:
+        parts = urlsplit(self._redact(url))
+        query = sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query)
+            if name not in _VOLATILE_PARAMS
+        )
+        return f"{method} {parts.netloc}{parts.path}?{urlencode(query)}"
+
+    def get(self, url, params=None, **kwargs) -> _RequestContext:
+        """GET, matching aiohttp.ClientSession.get."""
+        return _RequestContext(self._request("GET", url, params, kwargs))
+
+    def post(self, url, params=None, **kwargs) -> _RequestContext:
+        """POST, matching aiohttp.ClientSession.post."""
+        return _RequestContext(self._request("POST", url, params, kwargs))
+
+    @abstractmethod
+    async def _request(self, method, url, params, kwargs) -> _Response:
+        """Answer a single request."""
+
+    async def close(self) -> None:
+        """Sessions passed to KubUtility are never closed by it."""
+
+
+class RecordingSession(_Transport):
+    """Pass requests through to a real session and capture the responses.
+
+    Customer ids only become known as responses arrive, so they are replaced
+    when the exchanges are read rather than as each one is captured.
+    """
+
+    def __init__(self, session, secrets=()) -> None:
+        super().__init__(secrets)
+        self._session = session
+        self._captured: list[dict] = []
+        # Customer id -> placeholder, numbered per kind in order of discovery
+        self._ids: dict[str, str] = {}
+
+    async def _request(self, method, url, params, kwargs) -> _Response:
+        async with self._session.request(
+            method, url, params=params, **kwargs
+        ) as resp:
+            body = await resp.read()
+            headers = list(resp.headers.items())
+            final_url = str(resp.url)
+            status = resp.status
+        self._captured.append(
+            {
+                "key": self._key(method, _with_params(url, params)),
+                "status": status,
+                "url": self._redact(final_url),
+                "headers": [
+                    [name, self._redact_header(name, value)] for name, value in headers
+                ],
+                "body": self._redact_body(body.decode("utf-8", errors="replace")),
+            }
+        )
+        return _Response(final_url, status, headers, body)
+
+    @property
+    def exchanges(self) -> list[dict]:
+        """The captured exchanges with customer ids replaced by placeholders."""
+        if not self._ids:
+            return list(self._captured)
+        # Longest first, so an id that contains another is replaced whole
+        ids = sorted(self._ids, key=len, reverse=True)
+        pattern = re.compile(
+            r"(?<![\w-])(" + "|".join(map(re.escape, ids)) + r")(?![\w-])"
+        )
+
+        def anonymize(text: str) -> str:
+            return pattern.sub(lambda match: self._ids[match.group(1)], text)
+
+        return [
+            {
+                **exchange,
+                "key": anonymize(exchange["key"]),
+                "url": anonymize(exchange["url"]),
+                "headers": [
+                    [name, anonymize(value)] for name, value in exchange["headers"]
+                ],
+                "body": anonymize(exchange["body"]),
+            }
+            for exchange in self._captured
+        ]
+
+    def _learn_ids(self, document) -> None:
+        """Give each customer id in a decoded document its placeholder."""
+        found: dict[str, str] = {}
+        _collect_ids(document, found)
+        for id_, kind in found.items():
+            if id_ not in self._ids:
+                count = sum(
+                    placeholder.startswith(f"{kind}-")
+                    for placeholder in self._ids.values()
+                )
+                self._ids[id_] = f"{kind}-{count + 1}"
+
+    def _redact_header(self, name: str, value: str) -> str:
+        if name.lower() == "set-cookie":
+            cookie, sep, attributes = value.partition(";")
+            cookie_name = cookie.split("=", 1)[0]
+            return f"{cookie_name}={REDACTED}{sep}{attributes}"
+        if name.lower() == "location":
+            # The auth code is single use, but don't keep it anyway
+            return re.sub(r"([?&]code=)[^&]*", rf"\g<1>{REDACTED}", value)
+        return self._redact(value)
+
+    def _redact_body(self, body: str) -> str:
+        try:
+            document = json_loads(body)
+        except ValueError:
+            document = None
+        if isinstance(document, (dict, list)):
+            self._learn_ids(document)
+            body = json.dumps(_redact_fields(document))
+        body = _TOKEN_FIELD.sub(rf'"\g<1>": "{REDACTED}"', body)
+        return self._redact(body)
+
+    def save(self, path: str) -> None:
+        """Write the recorded exchanges to a gzipped JSON file."""
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump({"version": 1, "exchanges": self.exchanges}, file)
+
+
+class ReplaySession(_Transport):
+    """Serve recorded responses deterministically, without any network."""
+
+    def __init__(self, path: str, secrets=(), latency: float = 0.0) -> None:
+        super().__init__(secrets)
+        self.latency = latency
+        self.requests = 0
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            recording = json.load(file)
+        self._exchanges: dict[str, deque[dict]] = defaultdict(deque)
+        for exchange in recording["exchanges"]:
+            self._exchanges[exchange["key"]].append(exchange)
+
+    async def _request(self, method, url, params, kwargs) -> _Response:
+        key = self._key(method, _with_params(url, params))
+        queue = self._exchanges.get(key)
+        if not queue:
+            raise HTTPError(599, f"No recorded response for {key}")
+        # Serve in recorded order, repeating the last response once exhausted
+        exchange = queue.popleft() if len(queue) > 1 else queue[0]
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _Response(
+            exchange["url"],
+            exchange["status"],
+            exchange["headers"],
+            exchange["body"].encode(),
+        )
@@ -0,0 +1,125 @@
+"""On-demand profiling of KUB refreshes."""
+
+from __future__ import annotations
+
+import cProfile
+import datetime
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, PROFILE_DIR
+
+_LOGGER = logging.getLogger(__name__)
+
+# Stack frames kept per allocation by tracemalloc
+_TRACE_FRAMES = 5
+# Functions and allocation sites written to each report
+_REPORT_LINES = 40
+# Functions listed in the notification
+_SUMMARY_LINES = 8
+
+
+class KUBProfiler:
+    """Wrap the next few coordinator refreshes in cProfile and tracemalloc.
+
+    cProfile sees everything that runs on the event loop thread while a
+    refresh is in progress, so other integrations may show up in the stats.
+    """
+
+    def __init__(self, hass: HomeAssistant, refreshes: int) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self.remaining = refreshes
+        self.reports: list[str] = []
+
+    async def async_profile(self, refresh: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a single refresh under the profilers and write a report."""
+        self.remaining -= 1
+        stop_tracing = not tracemalloc.is_tracing()
+        if stop_tracing:
+            tracemalloc.start(_TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        # Snapshots walk every traced block, so they stay off the event loop
+        before = await self.hass.async_add_executor_job(tracemalloc.take_snapshot)
+        profile: cProfile.Profile | None = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (such as HA's own profiler integration) is active
+            _LOGGER.warning("cProfile is busy, profiling memory only")
+            profile = None
+        started = datetime.datetime.now()
+        try:
+            return await refresh()
+        finally:
+            if profile is not None:
+                profile.disable()
+            _current, peak = tracemalloc.get_traced_memory()
+            after = await self.hass.async_add_executor_job(tracemalloc.take_snapshot)
+            if stop_tracing:
+                tracemalloc.stop()
+            path = self.hass.config.path(
+                PROFILE_DIR, f"kub_{started.strftime('%Y%m%d_%H%M%S')}"
+            )
+            summary = await self.hass.async_add_executor_job(
+                _write_report, path, profile, before, after, peak
+            )
+            self.reports.append(path)
+            self._notify(path, summary, peak)
+
+    def _notify(self, path: str, summary: list[str], peak: int) -> None:
+        """Summarize the hottest functions in a persistent notification."""
+        lines = "\n".join(f"- `{line}`" for line in summary)
+        persistent_notification.async_create(
+            self.hass,
+            f"Peak traced memory {peak / 1024 / 1024:.1f} MiB.\n\n"
+            f"Hottest functions by cumulative time:\n{lines}\n\n"
+            f"Full stats in `{path}.prof` and `{path}.txt`.",
+            title="KUB refresh profile",
+            notification_id=f"{DOMAIN}_profile",
+        )
+
+
+def _write_report(
+    path: str,
+    profile: cProfile.Profile | None,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+) -> list[str]:
+    """Write the stats files and return a summary of the hottest functions."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    allocations = after.compare_to(before, "lineno")
+    report = io.StringIO()
+    summary: list[str] = []
+    if profile is not None:
+        profile.dump_stats(f"{path}.prof")
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_REPORT_LINES)
+        hottest = sorted(
+            stats.stats.items(),  # type: ignore[attr-defined]
+            key=lambda item: item[1][3],
+            reverse=True,
+        )
+        summary = [
+            f"{cumulative:.3f}s {pstats.func_std_string(func)}"
+            for func, (_cc, _nc, _tt, cumulative, _callers) in hottest[
+                :_SUMMARY_LINES
+            ]
+        ]
+
+    report.write(f"\nPeak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+    report.write("Top allocation sites still held after the refresh:\n")
+    for allocation in allocations[:_REPORT_LINES]:
+        report.write(f"{allocation}\n")
+    with open(f"{path}.txt", "w", encoding="utf-8") as file:
+        file.write(report.getvalue())
+    return summary
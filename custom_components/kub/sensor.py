@@ -1,15 +1,20 @@
 """Platform for sensor integration."""
 
 import logging
+from typing import Any
 
 from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
-from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfVolume
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.typing import StateType
 
 from .const import DOMAIN, KUB_COORDINATOR
 from .entity import KUBEntity
 
+# Rollups change on every refresh, so keep the bulky ones out of the
+# recorder's state attributes table.
+ROLLUP_UNRECORDED_ATTRIBUTES = frozenset({"daily", "hourly_profile", "peak_hours"})
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -25,13 +30,30 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
         KUBCostSensor(coordinator, service) for service in coordinator.account.keys()
     )
 
+    # Only services whose billing cycle was found in the account document
+    cycle_services = [
+        service
+        for service, service_id in coordinator.account.items()
+        if service_id in coordinator.api.billing_cycles
+    ]
+    async_add_entities(
+        KUBCycleSensor(coordinator, service) for service in cycle_services
+    )
+    async_add_entities(
+        KUBCycleCostSensor(coordinator, service) for service in cycle_services
+    )
+
+    async_add_entities([KUBFreshnessSensor(coordinator)])
+
 
 class KUBSensor(KUBEntity, SensorEntity):
     """KUB Sensor Class."""
 
+    _unrecorded_attributes = ROLLUP_UNRECORDED_ATTRIBUTES
+
     def __init__(self, coordinator, service) -> None:
         """Initialize KUB Sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, service)
         self._attr_unique_id = f"kub_{service}_consumption"
         self.key = service
         self._attr_has_entity_name = True
@@ -78,13 +100,20 @@ class KUBSensor(KUBEntity, SensorEntity):
             value = None
         return value
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the usage rollups for the current month."""
+        return self.coordinator.rollup.view(self.key, "usage") or None
+
 
 class KUBCostSensor(KUBEntity, SensorEntity):
     """KUB Cost Sensor Class."""
 
+    _unrecorded_attributes = ROLLUP_UNRECORDED_ATTRIBUTES
+
     def __init__(self, coordinator, service) -> None:
         """Initialize KUB Sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, service)
         self._attr_unique_id = f"kub_{service}_cost"
         self.key = service
         self._attr_has_entity_name = True
@@ -130,3 +159,92 @@ class KUBCostSensor(KUBEntity, SensorEntity):
         if value == "":
             value = None
         return value
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the cost rollups for the current month."""
+        return self.coordinator.rollup.view(self.key, "cost") or None
+
+
+def _cycle_attributes(coordinator, service: str) -> dict[str, Any]:
+    cycle = coordinator.data["cycle_total"][service]
+    return {"cycle_start": cycle["start"], "cycle_end": cycle["end"]}
+
+
+class KUBCycleSensor(KUBSensor):
+    """Consumption since the start of the current billing cycle."""
+
+    _unrecorded_attributes = frozenset()
+
+    def __init__(self, coordinator, service) -> None:
+        """Initialize KUB Cycle Sensor."""
+        super().__init__(coordinator, service)
+        self._attr_unique_id = f"kub_{service}_cycle_consumption"
+        self._attr_name = self._attr_name.replace(
+            "Consumption", "Billing Cycle Consumption"
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return native value for entity."""
+        return self.coordinator.data["cycle_total"][self.key]["usage"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the billing cycle dates."""
+        return _cycle_attributes(self.coordinator, self.key)
+
+
+class KUBCycleCostSensor(KUBCostSensor):
+    """Cost since the start of the current billing cycle."""
+
+    _unrecorded_attributes = frozenset()
+
+    def __init__(self, coordinator, service) -> None:
+        """Initialize KUB Cycle Cost Sensor."""
+        super().__init__(coordinator, service)
+        self._attr_unique_id = f"kub_{service}_cycle_cost"
+        self._attr_name = self._attr_name.replace("Cost", "Billing Cycle Cost")
+
+    @property
+    def native_value(self) -> StateType:
+        """Return native value for entity."""
+        return self.coordinator.data["cycle_total"][self.key]["cost"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the billing cycle dates."""
+        return _cycle_attributes(self.coordinator, self.key)
+
+
+class KUBFreshnessSensor(KUBEntity, SensorEntity):
+    """When KUB data was last refreshed, and whether it is being served stale."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+    _attr_name = "Last Update"
+    _attr_unique_id = "kub_last_update"
+
+    @property
+    def native_value(self) -> StateType:
+        """Return when the last good data was fetched."""
+        return self.coordinator.data["freshness"]["last_success"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return staleness, retry and per-service freshness details."""
+        freshness = self.coordinator.data["freshness"]
+        return {
+            "stale": freshness["stale"],
+            "version": freshness["version"],
+            "error": freshness["error"],
+            "retry_at": freshness["retry_at"],
+            "services": {
+                utility: {
+                    "fetched": service["fetched"].isoformat(),
+                    "newest_reading": service["newest_reading"],
+                }
+                for utility, service in freshness["services"].items()
+            },
+        }
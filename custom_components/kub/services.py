@@ -0,0 +1,243 @@
+"""Services for the KUB integration."""
+
+from __future__ import annotations
+
+import csv
+import datetime
+import logging
+import os
+
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+
+from .const import (
+    DOMAIN,
+    EXPORT_CHUNK_DAYS,
+    EXPORT_DIR,
+    EXPORT_FORMATS,
+    EXPORT_PROGRESS_EVENT,
+    KUB_API,
+    KUB_COORDINATOR,
+    SERVICE_EXPORT,
+    SERVICE_PROFILE,
+    SERVICE_REPAIR_STATISTICS,
+    STATISTICS_REPAIR_DAYS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_FORMAT = "format"
+ATTR_REFRESHES = "refreshes"
+ATTR_REFRESH_NOW = "refresh_now"
+ATTR_DAYS = "days"
+
+# Rows buffered in memory before they are handed to the writer
+_FLUSH_ROWS = 5000
+_COLUMNS = ["utility", "read_date_time", "usage", "uom", "cost"]
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Required(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_FORMAT, default="csv"): vol.In(EXPORT_FORMATS),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_REFRESHES, default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=10)
+        ),
+        vol.Optional(ATTR_REFRESH_NOW, default=True): cv.boolean,
+    }
+)
+
+REPAIR_STATISTICS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DAYS, default=STATISTICS_REPAIR_DAYS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=730)
+        ),
+    }
+)
+
+
+def _entry_data(call: ServiceCall) -> dict:
+    """Return hass.data for the entry named in the call, or the first one."""
+    entries = call.hass.data.get(DOMAIN, {})
+    entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID) or next(iter(entries), None)
+    if entry_id not in entries:
+        raise HomeAssistantError(f"No loaded KUB config entry {entry_id}")
+    return entries[entry_id]
+
+
+class _CsvWriter:
+    """Append rows to a CSV file."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(_COLUMNS)
+
+    def write(self, rows: list[tuple]) -> None:
+        """Write a batch of rows."""
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Append rows to a Parquet file, one row group per batch."""
+
+    def __init__(self, path: str) -> None:
+        # Imported on first use, in the executor, as pyarrow is slow to load
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("utility", pa.string()),
+                ("read_date_time", pa.timestamp("s")),
+                ("usage", pa.float64()),
+                ("uom", pa.string()),
+                ("cost", pa.float64()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows: list[tuple]) -> None:
+        """Write a batch of rows as a row group."""
+        columns = list(zip(*rows))
+        columns[1] = [
+            datetime.datetime.fromisoformat(value) for value in columns[1]
+        ]
+        self._writer.write_table(
+            self._pa.Table.from_arrays(
+                [self._pa.array(column) for column in columns], schema=self._schema
+            )
+        )
+
+    def close(self) -> None:
+        """Close the file."""
+        self._writer.close()
+
+
+def _open_writer(path: str, file_format: str) -> _CsvWriter | _ParquetWriter:
+    """Create the export directory and open a writer for the format."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if file_format == "parquet":
+        return _ParquetWriter(path)
+    return _CsvWriter(path)
+
+
+async def _async_export(call: ServiceCall) -> ServiceResponse:
+    """Stream hourly usage and cost for a date range to a file."""
+    hass = call.hass
+    kub = _entry_data(call)[KUB_API]
+
+    start: datetime.date = call.data[ATTR_START_DATE]
+    end: datetime.date = call.data[ATTR_END_DATE]
+    if end < start:
+        raise HomeAssistantError("end_date must not be before start_date")
+    file_format = call.data[ATTR_FORMAT]
+    path = hass.config.path(
+        EXPORT_DIR, f"kub_{start.isoformat()}_{end.isoformat()}.{file_format}"
+    )
+
+    writer = await hass.async_add_executor_job(_open_writer, path, file_format)
+    total_days = (end - start).days + 1
+    rows: list[tuple] = []
+    written = 0
+    # Utilities are fetched one after another, so progress follows the
+    # furthest date seen rather than the date of the latest row.
+    furthest = start.isoformat()
+
+    async def _flush() -> None:
+        nonlocal rows, written
+        await hass.async_add_executor_job(writer.write, rows)
+        written += len(rows)
+        rows = []
+        done = (datetime.date.fromisoformat(furthest) - start).days + 1
+        progress = min(100, round(done * 100 / total_days))
+        _LOGGER.debug("Exported %s rows to %s (%s%%)", written, path, progress)
+        hass.bus.async_fire(
+            EXPORT_PROGRESS_EVENT,
+            {"path": path, "rows": written, "progress": progress},
+        )
+
+    try:
+        async for utility, date, hours in kub.iter_usage_by_range(
+            start.isoformat(), end.isoformat(), chunk_days=EXPORT_CHUNK_DAYS
+        ):
+            rows.extend(
+                (
+                    utility,
+                    hour["readDateTime"],
+                    hour["utilityUsed"],
+                    hour["uom"],
+                    hour["cost"],
+                )
+                for hour in hours.values()
+            )
+            furthest = max(furthest, date)
+            if len(rows) >= _FLUSH_ROWS:
+                await _flush()
+        if rows:
+            await _flush()
+    finally:
+        await hass.async_add_executor_job(writer.close)
+
+    return {"path": path, "rows": written}
+
+
+async def _async_profile(call: ServiceCall) -> None:
+    """Profile the next refreshes of a KUB account."""
+    coordinator = _entry_data(call)[KUB_COORDINATOR]
+    refreshes = call.data[ATTR_REFRESHES]
+    await coordinator.async_start_profiling(refreshes)
+    if call.data[ATTR_REFRESH_NOW]:
+        for _ in range(refreshes):
+            await coordinator.async_refresh()
+
+
+async def _async_repair_statistics(call: ServiceCall) -> ServiceResponse:
+    """Refill days missing from a KUB account's statistics."""
+    coordinator = _entry_data(call)[KUB_COORDINATOR]
+    repaired = await coordinator.async_repair_statistics(call.data[ATTR_DAYS])
+    return {"repaired": repaired}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the KUB services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT,
+        _async_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPAIR_STATISTICS,
+        _async_repair_statistics,
+        schema=REPAIR_STATISTICS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,220 @@
+"""Authenticated KUB session handling for the KUB integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+
+from .const import (
+    CONF_WASTEWATER_MULTIPLIER,
+    DEFAULT_WASTEWATER_MULTIPLIER,
+    SESSION_HANDOFF,
+    SESSION_HANDOFF_TTL,
+    SESSION_REGISTRY,
+)
+
+if TYPE_CHECKING:
+    from kub import kub_utilities
+
+    from .coordinator import KUBCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_store_session(
+    hass: HomeAssistant, api: kub_utilities.KubUtility, replace: bool = True
+) -> None:
+    """Hand an authenticated KubUtility from a config flow to entry setup.
+
+    The flow has already logged in and loaded the account, so setup can pick
+    the instance up instead of logging in again. Handoffs are kept in memory
+    only and are dropped after SESSION_HANDOFF_TTL seconds. With replace
+    False a usable handoff already stored, such as a reauth's new login, is
+    kept.
+    """
+    handoffs: dict[str, kub_utilities.KubUtility] = hass.data.setdefault(
+        SESSION_HANDOFF, {}
+    )
+    current = handoffs.get(api.username)
+    if not replace and current is not None and current.is_session_active:
+        return
+    handoffs[api.username] = api
+
+    @callback
+    def _expire() -> None:
+        if handoffs.get(api.username) is api:
+            del handoffs[api.username]
+
+    hass.loop.call_later(SESSION_HANDOFF_TTL, _expire)
+
+
+@callback
+def async_get_session(
+    hass: HomeAssistant, username: str, password: str
+) -> kub_utilities.KubUtility | None:
+    """Return a handed off KubUtility for the credentials if it is still usable.
+
+    The handoff is not consumed, so the reloads triggered by a reauth or an
+    entry update within the TTL all reuse the same login.
+    """
+    api = hass.data.get(SESSION_HANDOFF, {}).get(username)
+    if api is None or api.password != password or not api.is_session_active:
+        return None
+    _LOGGER.debug("Reusing the config flow login for %s", username)
+    return api
+
+
+@dataclass
+class SharedLogin:
+    """One KubUtility and coordinator shared by every entry with a username."""
+
+    api: kub_utilities.KubUtility
+    coordinator: KUBCoordinator
+    entry_ids: list[str] = field(default_factory=list)
+    # Set once the coordinator's first refresh has finished, successfully or not
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class _Registry:
+    logins: dict[str, SharedLogin] = field(default_factory=dict)
+    # Per username, so logins for different accounts are set up in parallel
+    locks: dict[str, asyncio.Lock] = field(default_factory=dict)
+
+    def lock(self, username: str) -> asyncio.Lock:
+        return self.locks.setdefault(username, asyncio.Lock())
+
+
+def _registry(hass: HomeAssistant) -> _Registry:
+    return hass.data.setdefault(SESSION_REGISTRY, _Registry())
+
+
+async def async_acquire_login(hass: HomeAssistant, entry: ConfigEntry) -> SharedLogin:
+    """Return the shared login for an entry's username, creating it if needed.
+
+    The first entry for a username logs in, creates the coordinator and runs
+    its first refresh; later entries with the same credentials wait for that
+    refresh and reuse both, so KUB sees one login and one polling schedule per
+    username. Entries sharing a login share their options too.
+    """
+    # Imported here so this module stays light for the config flow
+    from kub import kub_utilities  # pylint: disable=import-outside-toplevel
+
+    from .coordinator import KUBCoordinator  # pylint: disable=import-outside-toplevel
+
+    username = entry.data.get("username")
+    password = entry.data.get("password")
+    registry = _registry(hass)
+    created = False
+    async with registry.lock(username):
+        shared = registry.logins.get(username)
+        if shared is not None and shared.api.password == password:
+            _LOGGER.debug("Sharing the KUB login for %s", username)
+            shared.entry_ids.append(entry.entry_id)
+            _async_adopt_options(hass, shared, entry)
+        else:
+            # Onboarding and reauth have just logged in; reuse that session
+            api = async_get_session(hass, username, password)
+            if api is None:
+                api = kub_utilities.KubUtility(username, password)
+                await api.retrieve_account_info()
+            api.wastewater_multiplier = entry.options.get(
+                CONF_WASTEWATER_MULTIPLIER, DEFAULT_WASTEWATER_MULTIPLIER
+            )
+            if shared is not None:
+                # The password changed; retire the login of the old one
+                await _async_retire(hass, registry, shared)
+            shared = SharedLogin(api, KUBCoordinator(hass, api), [entry.entry_id])
+            registry.logins[username] = shared
+            created = True
+    if not created:
+        await shared.ready.wait()
+        if registry.logins.get(username) is not shared:
+            shared.entry_ids.remove(entry.entry_id)
+            raise ConfigEntryNotReady("The shared KUB login failed its first refresh")
+        return shared
+
+    # Outside the lock, so entries for other logins aren't held up by KUB
+    try:
+        await shared.coordinator.async_config_entry_first_refresh()
+    except BaseException:
+        if registry.logins.get(username) is shared:
+            del registry.logins[username]
+        raise
+    finally:
+        shared.ready.set()
+    return shared
+
+
+async def _async_retire(
+    hass: HomeAssistant, registry: _Registry, shared: SharedLogin
+) -> None:
+    """Stop a login that is being replaced and reload the entries still on it."""
+    del registry.logins[shared.api.username]
+    await shared.api.stop_token_refresh()
+    for entry_id in shared.entry_ids:
+        hass.config_entries.async_schedule_reload(entry_id)
+
+
+@callback
+def _async_adopt_options(
+    hass: HomeAssistant, shared: SharedLogin, entry: ConfigEntry
+) -> None:
+    """Give an entry joining a login the options the login runs with."""
+    owner = shared.coordinator.config_entry
+    if owner is entry or entry.options == owner.options:
+        return
+    _LOGGER.info(
+        "%s shares the KUB login of %s and now uses its options",
+        entry.title,
+        owner.title,
+    )
+    hass.config_entries.async_update_entry(entry, options=dict(owner.options))
+
+
+@callback
+def async_share_options(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Copy changed options to the other entries sharing the entry's login.
+
+    Returns whether the entry should reload. Only the entry owning the
+    coordinator does, as reloading it reloads the others.
+    """
+    shared = _registry(hass).logins.get(entry.data.get("username"))
+    if shared is None or entry.entry_id not in shared.entry_ids:
+        return True
+    for entry_id in shared.entry_ids:
+        other = hass.config_entries.async_get_entry(entry_id)
+        if other is not None and other is not entry and other.options != entry.options:
+            hass.config_entries.async_update_entry(other, options=dict(entry.options))
+    return shared.coordinator.config_entry is entry
+
+
+async def async_release_login(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop an entry's reference to its shared login.
+
+    The login is closed with its last entry. The coordinator belongs to the
+    entry that created it and stops when that entry unloads, so if other
+    entries still use the login they are reloaded onto a new coordinator;
+    the login itself is handed over through the session handoff.
+    """
+    registry = _registry(hass)
+    username = entry.data.get("username")
+    async with registry.lock(username):
+        shared = registry.logins.get(username)
+        if shared is None or entry.entry_id not in shared.entry_ids:
+            return
+        shared.entry_ids.remove(entry.entry_id)
+        owner = shared.coordinator.config_entry.entry_id == entry.entry_id
+        if shared.entry_ids and not owner:
+            return
+        await _async_retire(hass, registry, shared)
+        # Lets a reload of these entries reuse the login, unless a reauth
+        # has just handed over a newer one
+        async_store_session(hass, shared.api, replace=False)
@@ -0,0 +1,517 @@
+"""Recorder statistics import for KUB.
+
+Imported lazily by the coordinator so the recorder modules aren't loaded
+until the first refresh.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    async_import_statistics,
+    get_last_statistics,
+    statistics_during_period,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.core import HomeAssistant
+from kub import kub_utilities
+
+from .const import CONF_WATER_STATISTICS, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+_TIMEZONE = ZoneInfo("EST")
+# Hours handed to the recorder per import call, about a week per batch
+_BATCH_HOURS = 168
+
+# A normalized hourly record: (start, usage, cost)
+HourlyRecord = tuple[datetime.datetime, float, float]
+
+
+def _hourly_records(
+    days: Mapping[str, Mapping], extra: Mapping[str, Mapping] | None = None
+) -> Iterator[HourlyRecord]:
+    """Yield the hours of complete days in order, one record at a time.
+
+    Usage and cost of the matching hour in extra, when given, are added in.
+    """
+    for date in sorted(days):
+        day = days[date]
+        # Skip loading statistics that don't have a full days worth of data
+        # We will populate this day on the next pass
+        # HA displays errors in utility usage if partial day stats are added
+        if len(day) < 20:
+            continue
+        extra_day = extra.get(date, {}) if extra is not None else {}
+        for time in sorted(day):
+            hour = day[time]
+            used = hour.get("utilityUsed") or 0.0
+            cost = hour.get("cost") or 0.0
+            if (extra_hour := extra_day.get(time)) is not None:
+                used += extra_hour.get("utilityUsed") or 0.0
+                cost += extra_hour.get("cost") or 0.0
+            naive_datetime = datetime.datetime.fromisoformat(hour["readDateTime"])
+            yield naive_datetime.replace(tzinfo=_TIMEZONE), used, cost
+
+
+def _after(
+    records: Iterable[HourlyRecord], last_start: float | None
+) -> Iterator[HourlyRecord]:
+    """Drop hours at or before the last hour already in the recorder."""
+    for record in records:
+        if last_start is None or record[0].timestamp() > last_start:
+            yield record
+
+
+def _batched(records: Iterable[HourlyRecord], size: int) -> Iterator[list]:
+    """Group records into lists of at most size records."""
+    batch: list[HourlyRecord] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _async_last_statistic(
+    hass: HomeAssistant, statistic_id: str
+) -> tuple[float | None, float]:
+    """Return the start timestamp and sum of the newest imported hour."""
+    last = await get_instance(hass).async_add_executor_job(
+        get_last_statistics, hass, 1, statistic_id, True, {"sum"}
+    )
+    if not last.get(statistic_id):
+        return None, 0.0
+    row = last[statistic_id][0]
+    return row["start"], row.get("sum") or 0.0
+
+
+def _metadata(utility: str) -> tuple[StatisticMetaData, StatisticMetaData]:
+    """Return the cost and consumption metadata for a utility."""
+    name_prefix = f"KUB {utility.capitalize()}"
+    cost_metadata = StatisticMetaData(
+        mean_type=StatisticMeanType.NONE,
+        has_sum=True,
+        name=f"{name_prefix} Cost",
+        source="recorder",
+        statistic_id=f"sensor.kub_{utility}_cost",
+        unit_of_measurement="USD",
+        unit_class=None,
+    )
+
+    if utility == kub_utilities.KUBUtilityTypes.ELECTRICITY.name.lower():
+        unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+        unit_class = "energy"
+    elif utility == kub_utilities.KUBUtilityTypes.GAS.name.lower():
+        unit_of_measurement = UnitOfVolume.CENTUM_CUBIC_FEET
+        unit_class = "volume"
+    else:
+        unit_of_measurement = UnitOfVolume.CUBIC_FEET
+        unit_class = "volume"
+
+    consumption_metadata = StatisticMetaData(
+        mean_type=StatisticMeanType.NONE,
+        has_sum=True,
+        name=f"{name_prefix} Consumption",
+        source="recorder",
+        statistic_id=f"sensor.kub_{utility}_consumption",
+        unit_of_measurement=unit_of_measurement,
+        unit_class=unit_class,
+    )
+    return cost_metadata, consumption_metadata
+
+
+def _day_start(start: datetime.datetime) -> datetime.datetime:
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(start: datetime.datetime) -> datetime.datetime:
+    return _day_start(start).replace(day=1)
+
+
+_ROLLUP_PERIODS = {"daily": _day_start, "monthly": _month_start}
+
+
+def _rollup_metadata(metadata: StatisticMetaData, period: str) -> StatisticMetaData:
+    """Metadata of the daily or monthly series kept alongside an hourly one."""
+    # sensor.kub_electricity_cost -> kub:electricity_cost_daily
+    object_id = metadata["statistic_id"].split(".", 1)[1].removeprefix(f"{DOMAIN}_")
+    return StatisticMetaData(
+        mean_type=StatisticMeanType.NONE,
+        has_sum=True,
+        name=f"{metadata['name']} ({period})",
+        source=DOMAIN,
+        statistic_id=f"{DOMAIN}:{object_id}_{period}",
+        unit_of_measurement=metadata["unit_of_measurement"],
+        unit_class=metadata["unit_class"],
+    )
+
+
+class _Rollup:
+    """Daily or monthly rows built from hourly (start, state, sum) values.
+
+    A row's state is the period's total and its sum is the hourly sum at the
+    end of the period, so charts read one row per day or month. Seeded with
+    the stored row for the period the hours continue, so a period spread
+    over several imports keeps its total.
+    """
+
+    def __init__(self, period: str, row: dict | None = None) -> None:
+        self._period_start = _ROLLUP_PERIODS[period]
+        self._start: datetime.datetime | None = None
+        self._base = 0.0
+        self._sum = 0.0
+        if row is not None:
+            self._start = datetime.datetime.fromtimestamp(row["start"], _TIMEZONE)
+            self._sum = row.get("sum") or 0.0
+            self._base = self._sum - (row.get("state") or 0.0)
+        self.rows: list[StatisticData] = []
+
+    def add(self, start: datetime.datetime, state: float, total: float) -> None:
+        """Fold in one hour with its state and running sum."""
+        period_start = self._period_start(start.astimezone(_TIMEZONE))
+        if period_start != self._start:
+            self._emit()
+            self._start = period_start
+            self._base = total - state
+        self._sum = total
+
+    def _emit(self) -> None:
+        if self._start is not None:
+            self.rows.append(
+                StatisticData(
+                    start=self._start, state=self._sum - self._base, sum=self._sum
+                )
+            )
+
+    def finish(self) -> list[StatisticData]:
+        """Return the rows, including the still open period."""
+        self._emit()
+        self._start = None
+        return self.rows
+
+
+async def _async_rollups(
+    hass: HomeAssistant,
+    metadata: StatisticMetaData,
+    continuing: datetime.datetime | None = None,
+) -> dict[str, _Rollup]:
+    """Create the daily and monthly rollups of an hourly series.
+
+    Each is seeded with its latest stored row, or when continuing is given
+    with the stored row of the period containing that hour.
+    """
+    rollups = {}
+    for period, period_start in _ROLLUP_PERIODS.items():
+        statistic_id = _rollup_metadata(metadata, period)["statistic_id"]
+        if continuing is None:
+            found = await get_instance(hass).async_add_executor_job(
+                get_last_statistics, hass, 1, statistic_id, True, {"state", "sum"}
+            )
+        else:
+            start = period_start(continuing.astimezone(_TIMEZONE))
+            found = await get_instance(hass).async_add_executor_job(
+                statistics_during_period,
+                hass,
+                start,
+                start + datetime.timedelta(hours=1),
+                {statistic_id},
+                "hour",
+                None,
+                {"state", "sum"},
+            )
+        rows = found.get(statistic_id)
+        rollups[period] = _Rollup(period, rows[0] if rows else None)
+    return rollups
+
+
+def _import_rollups(
+    hass: HomeAssistant, metadata: StatisticMetaData, rollups: dict[str, _Rollup]
+) -> None:
+    """Write the rows of each rollup to its external statistic."""
+    for period, rollup in rollups.items():
+        if rows := rollup.finish():
+            async_add_external_statistics(
+                hass, _rollup_metadata(metadata, period), rows
+            )
+
+
+async def async_insert_statistics(
+    hass: HomeAssistant, config_entry: ConfigEntry, usage: dict[str, Any]
+) -> None:
+    """Insert KUB statistics.
+
+    Hours flow through a chain of generators (complete days, then hours newer
+    than the recorder's last statistic) and are imported a batch at a time,
+    continuing the running sums from the recorder. Only one batch of
+    StatisticData is held at once however long the fetched range is.
+    """
+    for utility, days in usage.items():
+        utility = utility.lower()
+        cost_metadata, consumption_metadata = _metadata(utility)
+        cost_statistic_id = cost_metadata["statistic_id"]
+        consumption_statistic_id = consumption_metadata["statistic_id"]
+        _LOGGER.debug(
+            "Updating Statistics for %s and %s",
+            cost_statistic_id,
+            consumption_statistic_id,
+        )
+
+        last_start, consumption_sum = await _async_last_statistic(
+            hass, consumption_statistic_id
+        )
+        _cost_start, cost_sum = await _async_last_statistic(hass, cost_statistic_id)
+
+        # If we are processing water and user has selected to include
+        # waste water, add the waste water hours to it as KUB bills them.
+        # For a combined W/S service these are derived from water itself.
+        extra = None
+        if (
+            utility == kub_utilities.KUBUtilityTypes.WATER.name.lower()
+            and config_entry.options.get(CONF_WATER_STATISTICS, False) is True
+        ):
+            extra = usage.get(kub_utilities.KUBUtilityTypes.WASTEWATER.name.lower())
+
+        records = _after(_hourly_records(days, extra), last_start)
+        cost_rollups: dict[str, _Rollup] | None = None
+        consumption_rollups: dict[str, _Rollup] = {}
+        for batch in _batched(records, _BATCH_HOURS):
+            if cost_rollups is None:
+                # Only look up the rollups once there are new hours for them
+                cost_rollups = await _async_rollups(hass, cost_metadata)
+                consumption_rollups = await _async_rollups(hass, consumption_metadata)
+            cost_statistics = []
+            consumption_statistics = []
+            for start, used, cost in batch:
+                cost_sum += cost
+                consumption_sum += used
+                cost_statistics.append(
+                    StatisticData(start=start, state=cost, sum=cost_sum)
+                )
+                consumption_statistics.append(
+                    StatisticData(start=start, state=used, sum=consumption_sum)
+                )
+                for rollup in cost_rollups.values():
+                    rollup.add(start, cost, cost_sum)
+                for rollup in consumption_rollups.values():
+                    rollup.add(start, used, consumption_sum)
+            async_import_statistics(hass, cost_metadata, cost_statistics)
+            async_import_statistics(
+                hass, consumption_metadata, consumption_statistics
+            )
+        if cost_rollups is not None:
+            _import_rollups(hass, cost_metadata, cost_rollups)
+            _import_rollups(hass, consumption_metadata, consumption_rollups)
+
+
+def _local_date(timestamp: float) -> str:
+    """Return the KUB (EST) %Y-%m-%d date of a statistic start."""
+    return datetime.datetime.fromtimestamp(timestamp, _TIMEZONE).strftime("%Y-%m-%d")
+
+
+def _incomplete_days(rows: list[dict]) -> set[str]:
+    """Return the days between the first and last row with under 20 hours.
+
+    Whole days are imported once KUB has at least 20 of their hours, so a
+    day below that inside the imported timeline was skipped or lost.
+    """
+    if not rows:
+        return set()
+    counts: dict[str, int] = {}
+    for row in rows:
+        date = _local_date(row["start"])
+        counts[date] = counts.get(date, 0) + 1
+    first = datetime.date.fromisoformat(min(counts))
+    last = datetime.date.fromisoformat(max(counts))
+    incomplete = set()
+    for offset in range((last - first).days + 1):
+        date = (first + datetime.timedelta(days=offset)).isoformat()
+        if counts.get(date, 0) < 20:
+            incomplete.add(date)
+    return incomplete
+
+
+async def _async_sum_before(
+    hass: HomeAssistant, statistic_id: str, before: datetime.datetime
+) -> float:
+    """Return the running sum of the newest hour before a time, or 0 if none.
+
+    The hour before a gap is usually close by, so the lookup widens from a
+    day back until it finds one.
+    """
+    for days in (1, 31, 366, None):
+        if days is None:
+            start = datetime.datetime.fromtimestamp(0, datetime.UTC)
+        else:
+            start = before - datetime.timedelta(days=days)
+        found = await get_instance(hass).async_add_executor_job(
+            statistics_during_period,
+            hass,
+            start,
+            before,
+            {statistic_id},
+            "hour",
+            None,
+            {"sum"},
+        )
+        if rows := found.get(statistic_id):
+            return rows[-1].get("sum") or 0.0
+    return 0.0
+
+
+def _resummed(
+    rows: list[dict], fill: dict[float, float], base: float
+) -> Iterator[StatisticData]:
+    """Merge filled hours into the imported rows and recompute running sums.
+
+    Only hours from the first filled one onward are yielded, since every sum
+    after a gap shifts by what was filled in. base is the sum of the last
+    hour before the first filled one, which may lie before rows begin.
+    """
+    first_fill = min(fill)
+    total = base
+    merged = dict(fill)
+    for row in rows:
+        if row["start"] >= first_fill and row["start"] not in merged:
+            merged[row["start"]] = row.get("state") or 0.0
+    for start in sorted(merged):
+        total += merged[start]
+        yield StatisticData(
+            start=datetime.datetime.fromtimestamp(start, datetime.UTC),
+            state=merged[start],
+            sum=total,
+        )
+
+
+def _spans(dates: list[str]) -> Iterator[tuple[str, str]]:
+    """Group sorted dates into (first, last) runs of consecutive days."""
+    first = last = None
+    for date in dates:
+        day = datetime.date.fromisoformat(date)
+        if last is not None and day - last == datetime.timedelta(days=1):
+            last = day
+            continue
+        if first is not None:
+            yield first.isoformat(), last.isoformat()
+        first = last = day
+    if first is not None:
+        yield first.isoformat(), last.isoformat()
+
+
+async def _async_fetch_days(
+    kub: kub_utilities.KubUtility, dates: list[str]
+) -> dict[str, Mapping[str, Mapping]]:
+    """Fetch only the given days, a month at a time and through the rate limit."""
+    wanted = set(dates)
+    days: dict[str, Mapping[str, Mapping]] = {}
+    for first, last in _spans(dates):
+        async for utility, date, hours in kub.iter_usage_by_range(first, last):
+            if date in wanted:
+                days.setdefault(utility, {})[date] = hours
+    if kub.wastewater_combined:
+        days[kub_utilities.KUBUtilityTypes.WASTEWATER.name.lower()] = (
+            kub_utilities.WastewaterView(
+                days.get(kub_utilities.KUBUtilityTypes.WATER.name.lower(), {}),
+                kub.wastewater_multiplier,
+                kub.wastewater_rate,
+            )
+        )
+    return days
+
+
+async def async_repair_statistics(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    kub: kub_utilities.KubUtility,
+    days: int,
+) -> dict[str, int]:
+    """Refill days missing from the imported statistics of the last days.
+
+    Days with fewer than 20 imported hours are refetched from KUB, and each
+    affected statistic is re-imported from its first gap onward with running
+    sums recomputed. Returns the number of hours filled per statistic.
+    """
+    recorder = get_instance(hass)
+    # Let queued imports land first so the sums read here are current
+    await recorder.async_block_till_done()
+    start_time = datetime.datetime.combine(
+        datetime.date.today() - datetime.timedelta(days=days),
+        datetime.time(),
+        _TIMEZONE,
+    )
+    metadata = {utility: _metadata(utility) for utility in kub.account}
+    statistic_ids = {
+        item["statistic_id"] for pair in metadata.values() for item in pair
+    }
+    existing = await recorder.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        start_time,
+        None,
+        statistic_ids,
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    incomplete = {
+        statistic_id: _incomplete_days(rows)
+        for statistic_id, rows in existing.items()
+    }
+    dates = sorted(set().union(*incomplete.values()))
+    if not dates:
+        return {}
+    _LOGGER.debug("Refetching %s days missing from statistics", len(dates))
+    fetched = await _async_fetch_days(kub, dates)
+
+    repaired: dict[str, int] = {}
+    for utility, (cost_metadata, consumption_metadata) in metadata.items():
+        extra = None
+        if (
+            utility == kub_utilities.KUBUtilityTypes.WATER.name.lower()
+            and config_entry.options.get(CONF_WATER_STATISTICS, False) is True
+        ):
+            extra = fetched.get(kub_utilities.KUBUtilityTypes.WASTEWATER.name.lower())
+        records = list(_hourly_records(fetched.get(utility, {}), extra))
+        for metadata_item, field in ((consumption_metadata, 1), (cost_metadata, 2)):
+            statistic_id = metadata_item["statistic_id"]
+            rows = existing.get(statistic_id, [])
+            gaps = incomplete.get(statistic_id, set())
+            present = {row["start"] for row in rows}
+            fill = {}
+            for record in records:
+                start = record[0].timestamp()
+                if start not in present and _local_date(start) in gaps:
+                    fill[start] = record[field]
+            if not fill:
+                continue
+            first_fill = datetime.datetime.fromtimestamp(min(fill), _TIMEZONE)
+            rollups = await _async_rollups(hass, metadata_item, first_fill)
+            base = await _async_sum_before(hass, statistic_id, first_fill)
+            for batch in _batched(_resummed(rows, fill, base), _BATCH_HOURS):
+                async_import_statistics(hass, metadata_item, batch)
+                for statistic in batch:
+                    for rollup in rollups.values():
+                        rollup.add(
+                            statistic["start"], statistic["state"], statistic["sum"]
+                        )
+            _import_rollups(hass, metadata_item, rollups)
+            repaired[statistic_id] = len(fill)
+    if repaired:
+        _LOGGER.info("Repaired KUB statistics: %s", repaired)
+        await recorder.async_block_till_done()
+    return repaired
@@ -0,0 +1,10 @@
+"""Shared test setup for the KUB integration and library."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The integration imports its library as the top-level kub package
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "kub"))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,82 @@
+"""Fake KUB transport for exercising KubUtility without the network."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from kub.kub_utilities import HTTPError, KubUtility, KUBUtilityTypes, _date_range
+
+
+class FakeResponse:
+    """The parts of aiohttp.ClientResponse that Http uses."""
+
+    def __init__(self, status: int = 200, body: bytes = b"", headers=None) -> None:
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+        self.content_length = len(body) if body else None
+
+    async def read(self) -> bytes:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise HTTPError(self.status, f"HTTP {self.status}")
+
+    def release(self) -> None:
+        """Nothing to release."""
+
+
+class FakeSession:
+    """Answers GETs with handler(url, headers) and records every request."""
+
+    def __init__(self, handler) -> None:
+        self.handler = handler
+        self.requests: list[tuple[str, dict]] = []
+
+    async def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, headers or {}))
+        # Yield like a real request would, so concurrent callers interleave
+        await asyncio.sleep(0)
+        return self.handler(url, headers or {})
+
+
+def usage_document(start_date: str, end_date: str, value: float = 1.0) -> bytes:
+    """A usage-values response with 24 hours of value per day."""
+    values, aggregates = [], []
+    for date in _date_range(start_date, end_date):
+        values.append(
+            {"id": date, "readDateTime": f"{date}T00:00:00", "usageValuesChildren": [1]}
+        )
+        aggregates.append({"readValue": value * 24, "uom": "KWH", "cost": value})
+        for hour in range(24):
+            read = f"{date}T{hour:02d}:00:00"
+            values.append({"id": read, "readDateTime": read, "usageValuesChildren": []})
+            aggregates.append({"readValue": value, "uom": "KWH", "cost": value / 10})
+    return json.dumps({"usage-value": values, "usage-aggregate": aggregates}).encode()
+
+
+def usage_handler(url: str, headers: dict) -> FakeResponse:
+    """Serve usage-values requests for any range."""
+    query = parse_qs(urlsplit(url).query)
+    if "usage-values" not in url:
+        return FakeResponse(404)
+    return FakeResponse(
+        body=usage_document(query["startDate"][0], query["endDate"][0])
+    )
+
+
+def logged_in_utility(session, services=("electricity", "gas")) -> KubUtility:
+    """A KubUtility with a live session and known service points."""
+    kub = KubUtility("user@example.com", "secret", session=session)
+    kub._session_cookies = {"id_token": "token"}
+    kub._token_expires_at = datetime.now() + timedelta(hours=1)
+    kub.person_id = "person"
+    kub.account_id = "account"
+    for service in services:
+        kub.account[service] = f"{service}-point"
+        kub.service_list.append(KUBUtilityTypes[service.upper()])
+    return kub
@@ -0,0 +1,63 @@
+"""Tests for the hour range parser and the usage rollups."""
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from custom_components.kub.aggregation import KUBUsageRollup, parse_hour_ranges
+
+
+def _usage(day, values, cost=0.1):
+    """{"electricity": {day: hours}} with one reading per value from midnight."""
+    return {
+        "electricity": {
+            day: {
+                f"{hour:02d}:00:00": {
+                    "readDateTime": f"{day}T{hour:02d}:00:00",
+                    "utilityUsed": value,
+                    "cost": cost,
+                }
+                for hour, value in enumerate(values)
+            }
+        }
+    }
+
+
+def test_hour_ranges_exclude_the_end_and_wrap_midnight():
+    assert parse_hour_ranges("14-20") == frozenset(range(14, 20))
+    assert parse_hour_ranges("22-2, 7") == frozenset({22, 23, 0, 1, 7})
+    assert parse_hour_ranges("0-24") == frozenset(range(24))
+    assert parse_hour_ranges("") == frozenset()
+
+
+@pytest.mark.parametrize("value", ["25", "3-26", "-1-4", "a-b"])
+def test_bad_hour_ranges_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_hour_ranges(value)
+
+
+def test_rollup_buckets_and_peaks():
+    rollup = KUBUsageRollup(
+        on_peak=parse_hour_ranges("14-20"),
+        shoulder=parse_hour_ranges("7-14"),
+        peak_count=2,
+    )
+    assert rollup.update(_usage("2026-01-05", [1.0] * 23 + [5.0])) == {"electricity"}
+    view = rollup.view("electricity", "usage")
+    assert view["daily"] == {"2026-01-05": 28.0}
+    assert view["time_of_use"] == {"off_peak": 15.0, "on_peak": 6.0, "shoulder": 7.0}
+    assert view["hourly_profile"][23] == 5.0
+    assert [peak["start"] for peak in view["peak_hours"]] == [
+        "2026-01-05T23:00:00",
+        "2026-01-05T22:00:00",
+    ]
+
+
+def test_rollup_folds_each_reading_once():
+    """Readings already seen are skipped, so polls can resend the whole month."""
+    rollup = KUBUsageRollup()
+    rollup.update(_usage("2026-01-05", [1.0] * 12))
+    assert rollup.update(_usage("2026-01-05", [1.0] * 12)) == set()
+    assert rollup.update(_usage("2026-01-05", [1.0] * 24)) == {"electricity"}
+    assert rollup.view("electricity", "cost")["daily"] == {"2026-01-05": 2.4}
@@ -0,0 +1,67 @@
+"""Tests for the hourly usage anomaly detector."""
+
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from custom_components.kub.anomaly import KUBAnomalyDetector
+
+START = date(2026, 1, 1)
+
+
+def _days(utility, first, count, value=lambda day, hour: 0.0):
+    """{utility: {date: {time: reading}}} with value(day index, hour)."""
+    days = {}
+    for index in range(first, first + count):
+        day = (START + timedelta(days=index)).isoformat()
+        days[day] = {
+            f"{hour:02d}:00:00": {
+                "readDateTime": f"{day}T{hour:02d}:00:00",
+                "utilityUsed": value(index, hour),
+            }
+            for hour in range(24)
+        }
+    return {utility: days}
+
+
+def test_first_update_only_seeds_the_baseline():
+    """Readings already fetched before a restart are not reported again."""
+    detector = KUBAnomalyDetector()
+    spike = _days("gas", 0, 31, lambda day, hour: 20.0 if day == 30 else 0.0)
+
+    assert detector.update(spike) == []
+    assert detector.active["gas"] is None
+
+
+def test_new_hours_after_seeding_are_scored():
+    """A spike arriving after the first update is reported once."""
+    detector = KUBAnomalyDetector()
+    detector.update(_days("gas", 0, 30))
+
+    found = detector.update(
+        _days("gas", 30, 1, lambda day, hour: 20.0 if hour == 6 else 0.0)
+    )
+
+    assert [anomaly["start"] for anomaly in found] == ["2026-01-31T06:00:00"]
+    assert detector.active["gas"]["type"] == "gas_spike"
+
+
+def test_flat_baseline_ignores_a_single_unit_of_gas():
+    """Whole CCF readings over a zero MAD baseline are not spikes."""
+    detector = KUBAnomalyDetector()
+    detector.update(_days("gas", 0, 30))
+
+    assert detector.update(_days("gas", 30, 1, lambda day, hour: 1.0)) == []
+
+
+def test_water_leak_needs_flow_well_above_a_dry_night():
+    """Overnight flow on a dry baseline is flagged only when it is substantial."""
+    detector = KUBAnomalyDetector()
+    detector.update(_days("water", 0, 30))
+
+    assert detector.update(_days("water", 30, 1, lambda day, hour: 1.0)) == []
+    found = detector.update(_days("water", 31, 1, lambda day, hour: 3.0))
+    assert [anomaly["type"] for anomaly in found] == ["water_leak"]
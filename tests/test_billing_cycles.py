@@ -0,0 +1,63 @@
+"""Tests for reading billing cycles from the account document."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from helpers import FakeSession, logged_in_utility, usage_handler
+
+from kub.kub_utilities import _billing_cycles
+
+
+def _day(offset: int) -> str:
+    return (datetime.today() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _document(*bills) -> dict:
+    return {
+        "service-point": [{"id": "point"}],
+        "bill": [
+            {
+                "servicePointId": "point",
+                "billingPeriodStartDate": start,
+                "billingPeriodEndDate": end,
+            }
+            for start, end in bills
+        ],
+    }
+
+
+def test_current_cycle_is_picked_whatever_the_order():
+    """The bill covering today wins over older bills, in any document order."""
+    bills = [(_day(-70), _day(-40)), (_day(-10), _day(20)), (_day(-40), _day(-10))]
+    expected = {"point": {"start": _day(-10), "end": _day(20)}}
+    assert _billing_cycles(_document(*bills)) == expected
+    assert _billing_cycles(_document(*reversed(bills))) == expected
+
+
+def test_cycle_continues_from_the_last_ended_bill():
+    """With only closed bills, the current cycle opens at the latest read."""
+    document = _document((_day(-40), _day(-10)), (_day(-70), _day(-40)))
+    assert _billing_cycles(document) == {"point": {"start": _day(-10), "end": None}}
+
+
+def test_stale_or_missing_cycles_are_left_out():
+    assert _billing_cycles(_document((_day(-200), _day(-170)))) == {}
+    assert _billing_cycles({"service-point": [{"id": "point"}]}) == {}
+
+
+def test_cycle_started_before_the_window_is_totalled():
+    """Days of the cycle before the 31 polled days are fetched, not dropped."""
+
+    async def run():
+        kub = logged_in_utility(FakeSession(usage_handler), services=("electricity",))
+        kub.account["electricity"] = "point"
+        kub.billing_cycles = {"point": {"start": _day(-40), "end": _day(5)}}
+        await kub.retrieve_last_31_days()
+        return kub
+
+    kub = asyncio.run(run())
+    total = kub.cycle_total["electricity"]
+    assert total["start"] == _day(-40)
+    # 24 hourly readings a day from 40 days ago through today
+    assert total["usage"] == 24.0 * 41
+    assert min(kub.usage["electricity"]) > _day(-40)
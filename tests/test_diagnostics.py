@@ -0,0 +1,31 @@
+"""Tests for the diagnostics usage summary."""
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from custom_components.kub.diagnostics import _summarize_usage
+
+
+def _day(date: str, hours: int) -> dict:
+    return {
+        f"{hour:02d}:00:00": {
+            "readDateTime": f"{date}T{hour:02d}:00:00",
+            "utilityUsed": 1.0,
+            "cost": 0.1,
+        }
+        for hour in range(hours)
+    }
+
+
+def test_spring_dst_day_is_not_incomplete():
+    """23 readings complete the spring-forward day but not an ordinary one."""
+    days = {
+        "2026-03-08": _day("2026-03-08", 23),
+        "2026-03-09": _day("2026-03-09", 23),
+        "2026-11-01": _day("2026-11-01", 24),
+    }
+    summary = _summarize_usage(days)
+    assert summary["incomplete_days"] == {"2026-03-09": 23}
+    assert summary["hours"] == 70
@@ -0,0 +1,120 @@
+"""Tests for fetching usage with KubUtility."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from helpers import (
+    FakeResponse,
+    FakeSession,
+    logged_in_utility,
+    usage_document,
+    usage_handler,
+)
+
+from kub.kub_utilities import HTTPError, _parse_usage
+
+
+def test_range_iteration_survives_a_concurrent_poll():
+    """A poll finishing mid-export must not close or replace the export's Http."""
+    start = (datetime.today() - timedelta(days=70)).strftime("%Y-%m-%d")
+    end = (datetime.today() - timedelta(days=40)).strftime("%Y-%m-%d")
+
+    async def run():
+        kub = logged_in_utility(FakeSession(usage_handler))
+        rows = []
+        async for utility, date, hours in kub.iter_usage_by_range(
+            start, end, chunk_days=10
+        ):
+            rows.append((utility, date, len(hours)))
+            # Suspended between services of a chunk, a poll runs to completion
+            await kub.retrieve_last_31_days()
+        return rows
+
+    rows = asyncio.run(run())
+    assert len(rows) == 2 * 31
+    assert {hours for _utility, _date, hours in rows} == {24}
+
+
+def test_failed_poll_keeps_the_last_good_usage():
+    """A service failing part way must not leave the previous usage half updated."""
+    failing = []
+    total = None
+
+    def handler(url, headers):
+        if not failing:
+            return usage_handler(url, headers)
+        if "gas-point" in url:
+            return FakeResponse(500)
+        # The electricity fetch succeeds with new values
+        query = parse_qs(urlsplit(url).query)
+        return FakeResponse(
+            body=usage_document(query["startDate"][0], query["endDate"][0], 2.0)
+        )
+
+    async def run():
+        kub = logged_in_utility(FakeSession(handler))
+        await kub.retrieve_last_31_days()
+        usage, monthly = kub.usage, kub.monthly_total
+        snapshot = {utility: dict(days) for utility, days in usage.items()}
+        nonlocal total
+        total = monthly["electricity"]["usage"]
+        kub.usage_cache.clear()
+        failing.append(True)
+        with pytest.raises(HTTPError):
+            await kub.retrieve_last_31_days()
+        return kub, usage, monthly, snapshot
+
+    kub, usage, monthly, snapshot = asyncio.run(run())
+    assert kub.usage is usage
+    assert monthly["electricity"]["usage"] == total
+    assert kub.monthly_total is monthly
+    assert {utility: dict(days) for utility, days in usage.items()} == snapshot
+
+
+def test_reading_services_twice_lists_each_once():
+    """Re-reading the account document must not duplicate services."""
+    document = {
+        "service-point": [
+            {"id": "e", "type": "E-RES"},
+            {"id": "g", "type": "G-RES"},
+            {"id": "w", "type": "W/S-RES"},
+        ]
+    }
+
+    async def run():
+        body = json.dumps(document).encode()
+        session = FakeSession(lambda url, headers: FakeResponse(body=body))
+        kub = logged_in_utility(session, services=())
+        for _ in range(2):
+            async with kub._http() as http:
+                await kub._retrieve_services(http)
+        return kub
+
+    kub = asyncio.run(run())
+    assert [service.name for service in kub.service_list] == [
+        "ELECTRICITY",
+        "GAS",
+        "WATER",
+        "WASTEWATER",
+    ]
+
+
+def test_reading_stamped_midnight_stays_in_its_day():
+    """A day ending at the next day's T00:00:00 keeps that hour, across months too."""
+    values = [
+        {"id": "d", "readDateTime": "2026-01-31T00:00:00", "usageValuesChildren": [1]}
+    ]
+    aggregates = [{"readValue": 24.0, "uom": "KWH", "cost": 2.4}]
+    for hour in range(1, 25):
+        stamp = datetime(2026, 1, 31) + timedelta(hours=hour)
+        read = stamp.strftime("%Y-%m-%dT%H:%M:%S")
+        values.append({"id": read, "readDateTime": read, "usageValuesChildren": []})
+        aggregates.append({"readValue": 1.0, "uom": "KWH", "cost": 0.1})
+
+    days = _parse_usage({"usage-value": values, "usage-aggregate": aggregates})
+    assert list(days) == ["2026-01-31"]
+    assert len(days["2026-01-31"]) == 24
+    assert days["2026-01-31"]["00:00:00"]["readDateTime"] == "2026-02-01T00:00:00"
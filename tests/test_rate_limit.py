@@ -0,0 +1,42 @@
+"""Tests for the TokenBucket rate limiter."""
+
+import asyncio
+
+import pytest
+
+from kub.kub_utilities import TokenBucket
+
+
+def test_burst_is_served_then_callers_wait_their_turn():
+    async def run():
+        bucket = TokenBucket(rate=100.0, burst=2)
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+        return bucket.stats()
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 4
+    assert stats["delayed"] == 2
+    # The second waiter queues behind the first
+    assert stats["max_queued_seconds"] == pytest.approx(0.02, abs=0.005)
+
+
+def test_cancelled_waiter_returns_its_token():
+    async def run():
+        bucket = TokenBucket(rate=1.0, burst=1)
+        await bucket.acquire()
+        waiter = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return bucket._tokens
+
+    # Back to the empty bucket the first acquire left, not a token in debt
+    assert asyncio.run(run()) == pytest.approx(0.0, abs=0.01)
+
+
+def test_invalid_limits_are_rejected():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1.0, burst=0)
@@ -0,0 +1,98 @@
+"""Tests for recording and replaying KUB traffic."""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from helpers import FakeResponse, usage_handler
+
+from kub.kub_utilities import KubUtility
+from kub.replay import RecordingSession, ReplaySession
+
+USERNAME = "jane@example.com"
+PASSWORD = "hunter2"
+USER = {"person": [{"id": "P-778899", "accounts": ["A-112233"]}]}
+ACCOUNT = {
+    "account": [{"id": "A-112233", "name": "Jane Doe", "phone": "865-555-0100"}],
+    "premise": [{"id": "PR-4321", "address": "12 Oak Street"}],
+    "service-point": [
+        {
+            "id": "SP-4455",
+            "type": "E-RES",
+            "locationDetails": {"address": "12 Oak Street"},
+        }
+    ],
+}
+# Every value that would identify the account in a shared recording
+IDENTIFYING = [
+    USERNAME,
+    PASSWORD,
+    "P-778899",
+    "A-112233",
+    "PR-4321",
+    "SP-4455",
+    "Jane Doe",
+    "865-555-0100",
+    "12 Oak Street",
+]
+
+
+class _RecordedResponse(FakeResponse):
+    """A FakeResponse usable as aiohttp's request context manager."""
+
+    def __init__(self, url, response: FakeResponse) -> None:
+        super().__init__(response.status, response._body, response.headers)
+        self.url = url
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *err):
+        return None
+
+
+class _LiveSession:
+    """Stands in for the real aiohttp session behind the recorder."""
+
+    def request(self, method, url, params=None, **kwargs):
+        if "/users/" in url:
+            response = FakeResponse(body=json.dumps(USER).encode())
+        elif "/accounts/" in url:
+            response = FakeResponse(body=json.dumps(ACCOUNT).encode())
+        else:
+            response = usage_handler(url, {})
+        return _RecordedResponse(url, response)
+
+
+def _utility(session) -> KubUtility:
+    kub = KubUtility(USERNAME, PASSWORD, session=session)
+    kub._session_cookies = {"id_token": "token"}
+    kub._token_expires_at = datetime.now() + timedelta(hours=1)
+    return kub
+
+
+def test_saved_recording_holds_no_identifying_values(tmp_path):
+    path = str(tmp_path / "kub_fixture.json.gz")
+
+    async def record():
+        recorder = RecordingSession(_LiveSession(), secrets=[USERNAME, PASSWORD])
+        kub = _utility(recorder)
+        await kub.retrieve_last_31_days()
+        recorder.save(path)
+        return kub.usage
+
+    async def replay():
+        kub = _utility(ReplaySession(path, secrets=[USERNAME]))
+        await kub.retrieve_last_31_days()
+        return kub
+
+    recorded = asyncio.run(record())
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        saved = file.read()
+    assert [value for value in IDENTIFYING if value in saved] == []
+
+    # Placeholders stand in consistently, so the recording still replays
+    replayed = asyncio.run(replay())
+    assert replayed.account["electricity"] == "service-point-1"
+    assert replayed.usage["electricity"] == recorded["electricity"]
@@ -0,0 +1,71 @@
+"""Tests for conditional requests through ResponseCache."""
+
+import asyncio
+
+from helpers import FakeResponse, FakeSession
+
+from kub.kub_utilities import Http, ResponseCache
+
+URL = "https://www.kub.org/api/cis/v1/accounts/account?include=all"
+
+
+def _validating_handler(url, headers):
+    """Answer 304 to a matching If-None-Match, the body with its ETag otherwise."""
+    if headers.get("If-None-Match") == '"v1"':
+        return FakeResponse(304)
+    return FakeResponse(body=b'{"version": 1}', headers={"ETag": '"v1"'})
+
+
+async def _fetch(session, cache, conditional=True, times=2):
+    async with Http(
+        session=session, response_cache=cache, conditional=conditional
+    ) as http:
+        return [await http.fetch_json(URL) for _ in range(times)]
+
+
+def test_not_modified_is_served_from_the_cache():
+    session = FakeSession(_validating_handler)
+    cache = ResponseCache()
+    assert asyncio.run(_fetch(session, cache)) == [{"version": 1}] * 2
+    assert session.requests[1][1]["If-None-Match"] == '"v1"'
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_not_modified_after_eviction_refetches_in_full():
+    """A 304 for an entry evicted while the request was out is retried in full."""
+    cache = ResponseCache(max_entries=1)
+
+    def handler(url, headers):
+        if headers.get("If-None-Match"):
+            # Another request fills the cache before this one is answered
+            cache.put("https://www.kub.org/other", '"x"', None, {})
+        return _validating_handler(url, headers)
+
+    session = FakeSession(handler)
+    assert asyncio.run(_fetch(session, cache)) == [{"version": 1}] * 2
+    assert [headers for _url, headers in session.requests] == [
+        {},
+        {"If-None-Match": '"v1"'},
+        {},
+    ]
+
+
+def test_unconditional_wrapper_keeps_no_bodies():
+    """Exports and repairs neither send validators nor keep what they read."""
+    session = FakeSession(_validating_handler)
+    cache = ResponseCache()
+    assert asyncio.run(_fetch(session, cache, conditional=False)) == [
+        {"version": 1}
+    ] * 2
+    assert all(headers == {} for _url, headers in session.requests)
+    assert cache.get(URL) is None
+    assert cache.stats()["requests"] == 2
+
+
+def test_oldest_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    for index in range(3):
+        cache.put(f"url{index}", f'"{index}"', None, index)
+    cache.put("url1", '"1"', None, 1)
+    cache.put("url3", '"3"', None, 3)
+    assert [cache.get(f"url{index}") for index in range(4)] == [None, 1, None, 3]
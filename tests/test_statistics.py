@@ -0,0 +1,56 @@
+"""Tests for the statistics import helpers."""
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from custom_components.kub.statistics import _incomplete_days, _resummed
+
+HOUR = 3600
+
+
+def test_resummed_continues_from_the_sum_before_the_window():
+    """Hours filled before the first stored row continue the earlier sum."""
+    rows = [
+        {"start": 10 * HOUR, "state": 2.0, "sum": 102.0},
+        {"start": 11 * HOUR, "state": 1.0, "sum": 103.0},
+    ]
+    fill = {8 * HOUR: 1.0, 9 * HOUR: 1.0}
+
+    statistics = list(_resummed(rows, fill, base=100.0))
+
+    assert [statistic["state"] for statistic in statistics] == [1.0, 1.0, 2.0, 1.0]
+    assert [statistic["sum"] for statistic in statistics] == [
+        101.0,
+        102.0,
+        104.0,
+        105.0,
+    ]
+
+
+def test_resummed_leaves_hours_before_the_first_fill_alone():
+    """Only the first filled hour and those after it are re-imported."""
+    rows = [
+        {"start": 5 * HOUR, "state": 1.0, "sum": 101.0},
+        {"start": 7 * HOUR, "state": 1.0, "sum": 102.0},
+    ]
+
+    statistics = list(_resummed(rows, {6 * HOUR: 1.0}, base=101.0))
+
+    assert [statistic["start"].timestamp() for statistic in statistics] == [
+        6 * HOUR,
+        7 * HOUR,
+    ]
+    assert [statistic["sum"] for statistic in statistics] == [102.0, 103.0]
+
+
+def test_incomplete_days_flags_gaps_between_imported_days():
+    """A day with no hours between imported days is reported."""
+    day = 24 * HOUR
+    # Midnight EST on three consecutive days, the middle one missing
+    first = 5 * HOUR
+    rows = [{"start": first + hour * HOUR} for hour in range(24)]
+    rows += [{"start": first + 2 * day + hour * HOUR} for hour in range(24)]
+
+    assert _incomplete_days(rows) == {"1970-01-02"}
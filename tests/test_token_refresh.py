@@ -0,0 +1,39 @@
+"""Tests for scheduling the background session refresh."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from helpers import FakeSession, logged_in_utility, usage_handler
+
+
+def test_refresh_is_scheduled_only_when_the_session_would_lapse():
+    async def run():
+        kub = logged_in_utility(FakeSession(usage_handler))
+        # Valid for an hour, so a poll in 30 minutes needs nothing
+        kub.start_token_refresh(timedelta(minutes=30))
+        idle = kub._refresh_task
+        kub.start_token_refresh(timedelta(hours=2))
+        later = kub._refresh_task
+        # A refresh due sooner replaces it, one due later doesn't
+        kub.start_token_refresh(timedelta(hours=1, minutes=30))
+        sooner = kub._refresh_task
+        kub.start_token_refresh(timedelta(hours=3))
+        kept = kub._refresh_task
+        await kub.stop_token_refresh()
+        await asyncio.sleep(0)
+        return idle, later, sooner, kept
+
+    idle, later, sooner, kept = asyncio.run(run())
+    assert idle is None
+    assert later.cancelled()
+    assert kept is sooner
+
+
+def test_no_refresh_when_the_next_poll_is_within_the_lead():
+    async def run():
+        kub = logged_in_utility(FakeSession(usage_handler))
+        kub._token_expires_at = datetime.now()
+        kub.start_token_refresh(timedelta(minutes=2))
+        return kub._refresh_task
+
+    assert asyncio.run(run()) is None
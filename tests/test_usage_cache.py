@@ -0,0 +1,73 @@
+"""Tests for the day-level UsageCache."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from kub.kub_utilities import UsageCache
+
+FULL_DAY = {f"{hour:02d}:00:00": {} for hour in range(24)}
+
+
+def _day(offset: int) -> str:
+    return (datetime.today() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def test_closed_days_stay_and_open_days_expire():
+    cache = UsageCache(today_ttl=timedelta(0), open_ttl=timedelta(0))
+    cache.put("point", "E", _day(-5), FULL_DAY)
+    cache.put("point", "E", _day(-4), {"00:00:00": {}})
+    cache.put("point", "E", _day(-1), FULL_DAY)
+    cache.put("point", "E", _day(0), FULL_DAY)
+    assert cache.get("point", "E", _day(-5)) is FULL_DAY
+    # Partly published, yesterday and today are all still filling in
+    assert cache.get("point", "E", _day(-4)) is None
+    assert cache.get("point", "E", _day(-1)) is None
+    assert cache.get("point", "E", _day(0)) is None
+
+
+def test_oldest_days_are_evicted_beyond_max_days():
+    cache = UsageCache(max_days=2)
+    for offset in (-10, -9, -8):
+        cache.put("point", "E", _day(offset), FULL_DAY)
+    assert cache.get("point", "E", _day(-10)) is None
+    assert cache.get("point", "E", _day(-8)) is FULL_DAY
+
+
+def test_concurrent_requests_share_one_fetch():
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return {"fetched": len(calls)}
+
+    async def run():
+        cache = UsageCache()
+        first = await asyncio.gather(*(cache.coalesce("url", fetch) for _ in range(3)))
+        # Once finished, the next caller fetches again
+        second = await cache.coalesce("url", fetch)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [{"fetched": 1}] * 3
+    assert second == {"fetched": 2}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "hours"
+
+    async def run():
+        cache = UsageCache()
+        cancelled = asyncio.ensure_future(cache.coalesce("url", fetch))
+        waiting = asyncio.ensure_future(cache.coalesce("url", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await waiting
+
+    assert asyncio.run(run()) == "hours"